@@ -229,6 +229,7 @@ function CollegeBot() {
             <option value="IT">IT</option>
             <option value="CSBS">CSBS</option>
             <option value="AIDS">AIDS</option>
+            <option value="ALL">All Departments</option>
           </select>
           {/* Suggested Keywords */}
           <div style={{ marginBottom: "1rem" }}>
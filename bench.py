@@ -0,0 +1,184 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+import lamdainawscode as bot
+from local_aws import LocalBedrock, LocalS3, make_department_corpus, percentile
+from local_aws import install_stand_ins as install_local_aws
+
+SAMPLE_QUESTIONS = [
+    "Which faculty research machine learning?",
+    "Who wrote papers on network security?",
+    "What are the units of computer vision?",
+    "What is the vision of the department?",
+    "Tell me about distributed systems courses",
+    "Which professor has a best paper award?",
+]
+
+def install_stand_ins(s3, bedrock):
+    install_local_aws(bot, s3, bedrock)
+
+# ---------- BENCHMARKS ----------
+
+def bench_tokens(scale):
+    corpus = make_department_corpus(scale)
+    combined_text = "\n\n".join(corpus.values())
+    print(f"{'question':45} {'raw':>6} {'compact':>8} {'saved':>6}")
+    total_raw = total_compact = 0
+    for question in SAMPLE_QUESTIONS:
+        context = bot.find_best_chunks(combined_text, question)
+        compact = bot.serialize_context(context)
+        raw_tokens, compact_tokens = bot.estimate_tokens(context), bot.estimate_tokens(compact)
+        total_raw += raw_tokens
+        total_compact += compact_tokens
+        print(f"{question[:45]:45} {raw_tokens:6} {compact_tokens:8} {raw_tokens - compact_tokens:6}")
+    print(f"Input-token reduction: {100 * (total_raw - total_compact) / total_raw:.1f}%")
+
+    whole_raw = sum(bot.estimate_tokens(text) for text in corpus.values())
+    whole_compact = sum(bot.estimate_tokens(bot.compact_json_text(text)) for text in corpus.values())
+    print(f"Whole corpus: {whole_raw} → {whole_compact} tokens")
+
+def bench_deadline(budget, requests):
+    # Tail latency of fallback questions while Bedrock hangs, then fails outright
+    bot.REQUEST_BUDGET_SECONDS = budget
+    for mode in ("hang", "fail"):
+        bot.breaker_state.update({"failures": 0, "opened_at": None})
+        bedrock = LocalBedrock(mode=mode)
+        install_stand_ins(LocalS3({"cse": make_department_corpus()}), bedrock)
+        latencies, extractive = [], 0
+        for i in range(requests):
+            event = {"queryStringParameters": {"q": SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)] + " please",
+                                               "department": "cse"}}
+            start = time.perf_counter()
+            response = bot.lambda_handler(event, None)
+            latencies.append(time.perf_counter() - start)
+            extractive += json.loads(response["body"]).get("extractive", False)
+        print(f"bedrock={mode:5} p50={percentile(latencies, 50):.2f}s p99={percentile(latencies, 99):.2f}s "
+              f"max={max(latencies):.2f}s extractive={extractive}/{requests} bedrock_calls={bedrock.calls}")
+
+def legacy_best_context(bucket, keys, question):
+    # The pre-streaming path: concatenate every file, then chunk and sort the whole text
+    combined_text = ""
+    for key in keys:
+        combined_text += bot.read_file_from_s3(bucket, key) + "\n\n"
+    return bot.find_best_chunks(combined_text, question)
+
+def bench_memory(scales):
+    # Peak traced memory of the default branch retrieval as the department corpus grows
+    question = SAMPLE_QUESTIONS[0]
+    keys = [f"cse/{name}" for name in make_department_corpus(1)]
+    print(f"{'scale':>5} {'corpus KB':>10} {'concat KB':>10} {'stream KB':>10}")
+    for scale in scales:
+        files = make_department_corpus(scale)
+        install_stand_ins(LocalS3({"cse": files}), LocalBedrock())
+        peaks = []
+        for retrieve in (lambda: legacy_best_context("college-ai-data", keys, question),
+                         lambda: bot.find_best_chunks_in_stream(bot.stream_corpus("college-ai-data", keys), question)):
+            tracemalloc.start()
+            retrieve()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        corpus_kb = sum(len(text) for text in files.values()) // 1024
+        print(f"{scale:5} {corpus_kb:10} {peaks[0] // 1024:10} {peaks[1] // 1024:10}")
+
+BUNDLE_QUESTIONS = [
+    ("faculty list", "list faculty members"),
+    ("faculty fallback", "which professor teaches machine learning"),
+    ("syllabus", "syllabus for semester 3"),
+    ("default", "how do I apply for a bonafide certificate"),
+]
+
+def bench_bundle(latency):
+    # S3 requests and latency per route with nine plain objects vs one bundle object
+    files = make_department_corpus()
+    print(f"{'route':18} {'layout':7} {'cold calls':>10} {'warm calls':>10} {'warm ms':>8}")
+    for label, question in BUNDLE_QUESTIONS:
+        for use_bundle in (False, True):
+            s3 = LocalS3({"cse": files}, bundle=use_bundle, latency=latency)
+            install_stand_ins(s3, LocalBedrock(latency=0))
+            bot.bundle_tocs.clear()
+            event = {"queryStringParameters": {"q": question, "department": "cse"}}
+            bot.lambda_handler(event, None)
+            cold_calls, s3.calls = s3.calls, 0
+            start = time.perf_counter()
+            bot.lambda_handler(event, None)
+            warm_ms = (time.perf_counter() - start) * 1000
+            print(f"{label:18} {'bundle' if use_bundle else 'files':7} {cold_calls:10} {s3.calls:10} {warm_ms:8.1f}")
+
+def bench_fanout(latency, bundle):
+    # Retrieval latency as more departments are searched for one question
+    departments = ["cse", "it", "csbs", "aids"]
+    corpora = {department: make_department_corpus(seed=i) for i, department in enumerate(departments)}
+    filenames = list(corpora["cse"])
+    question = "which faculty work on iot and edge computing"
+    print(f"{'departments':>11} {'sequential ms':>14} {'fan-out ms':>11}")
+    for count in range(1, len(departments) + 1):
+        install_stand_ins(LocalS3(corpora, bundle=bundle, latency=latency), LocalBedrock())
+        bot.bundle_tocs.clear()
+        selected = departments[:count]
+        start = time.perf_counter()
+        for department in selected:
+            bot.find_best_chunks_in_stream(
+                bot.stream_corpus("college-ai-data", [f"{department}/{name}" for name in filenames]), question)
+        sequential_ms = (time.perf_counter() - start) * 1000
+        bot.bundle_tocs.clear()
+        start = time.perf_counter()
+        bot.find_best_chunks_across_departments("college-ai-data", selected, filenames, question)
+        fanout_ms = (time.perf_counter() - start) * 1000
+        print(f"{count:11} {sequential_ms:14.1f} {fanout_ms:11.1f}")
+
+FAQ_QUESTIONS = [
+    "What is the vision of the department?",
+    "what is the vision",
+    "department mission statement",
+    "what is the missoin",
+    "what are the program outcomes",
+    "program educational objectives",
+    "Tell me the department's vision",
+    "vision of cse",
+    "what is the goal of the department",
+    "what are the course outcomes of CS3401",
+]
+
+def bench_faq(bedrock_latency):
+    # FAQ-route questions answered from faqs.json vs always going through Claude
+    files = make_department_corpus()
+    threshold = bot.FAQ_MATCH_THRESHOLD
+    for label, bot.FAQ_MATCH_THRESHOLD in (("current (LLM)", float("inf")), ("faq fast path", threshold)):
+        install_stand_ins(LocalS3({"cse": files}), LocalBedrock(latency=bedrock_latency))
+        bot.faq_indexes.clear()
+        latencies, hits = [], 0
+        for question in FAQ_QUESTIONS:
+            bedrock_calls = bot.bedrock.calls
+            start = time.perf_counter()
+            bot.lambda_handler({"queryStringParameters": {"q": question, "department": "cse"}}, None)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += bot.bedrock.calls == bedrock_calls
+        print(f"{label:14} hit rate {hits}/{len(FAQ_QUESTIONS)}  p50 {percentile(latencies, 50):8.1f} ms  "
+              f"p95 {percentile(latencies, 95):8.1f} ms")
+    bot.FAQ_MATCH_THRESHOLD = threshold
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the college bot Lambda")
+    parser.add_argument("benchmark", choices=["tokens", "deadline", "memory", "bundle", "fanout", "faq"])
+    parser.add_argument("--scale", type=int, default=1, help="multiply the sample corpus size")
+    parser.add_argument("--budget", type=float, default=3.0, help="request budget in seconds for 'deadline'")
+    parser.add_argument("--requests", type=int, default=10, help="requests to send for 'deadline'")
+    parser.add_argument("--s3-latency", type=float, default=0.02, help="seconds per S3 request for 'bundle' and 'fanout'")
+    parser.add_argument("--bundle", action="store_true", help="serve corpus bundles for 'fanout'")
+    parser.add_argument("--bedrock-latency", type=float, default=1.5, help="seconds per Bedrock call for 'faq'")
+    args = parser.parse_args()
+
+    if args.benchmark == "tokens":
+        bench_tokens(args.scale)
+    elif args.benchmark == "deadline":
+        bench_deadline(args.budget, args.requests)
+    elif args.benchmark == "memory":
+        bench_memory([args.scale, args.scale * 4, args.scale * 16])
+    elif args.benchmark == "bundle":
+        bench_bundle(args.s3_latency)
+    elif args.benchmark == "fanout":
+        bench_fanout(args.s3_latency, args.bundle)
+    elif args.benchmark == "faq":
+        bench_faq(args.bedrock_latency)
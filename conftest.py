@@ -0,0 +1,17 @@
+import pytest
+
+from local_aws import LocalBedrock, LocalS3, install_stand_ins, make_department_corpus
+
+@pytest.fixture
+def bot(monkeypatch):
+    # lamdainawscode with in-memory S3/Bedrock and none of a previous test's container state
+    pytest.importorskip("boto3")
+    import lamdainawscode
+
+    for name in ("s3", "bedrock", "bedrock_pool", "shard_pool"):
+        monkeypatch.setattr(lamdainawscode, name, getattr(lamdainawscode, name))
+    monkeypatch.setattr(lamdainawscode, "breaker_state", {"failures": 0, "opened_at": None})
+    for cache in ("bundle_tocs", "query_indexes", "faq_indexes"):
+        monkeypatch.setattr(lamdainawscode, cache, {})
+    install_stand_ins(lamdainawscode, LocalS3({"cse": make_department_corpus()}), LocalBedrock())
+    return lamdainawscode
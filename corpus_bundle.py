@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+from collections import Counter
+
+# ---------- BUNDLE FORMAT ----------
+# A department's JSON files packed into one S3 object:
+#
+#   preamble   magic "CBND", format version (1 byte), TOC length (4 bytes, big-endian)
+#   TOC        JSON: {"sections": [{"name", "offset", "length", "size", "crc32", "compression"}]}
+#   sections   section payloads back to back; offsets are relative to the end of the TOC
+#
+# "size" and "crc32" describe the uncompressed file, so a stale TOC is caught on read.
+#
+# Once uploaded, the bundle is what the Lambda reads for every file it contains: editing a
+# plain <dept>/*.json object means rebuilding the bundle. Until then the Lambda sees the plain
+# object is newer than the bundle (one ListObjectsV2 per TOC fetch) and reads plain files.
+
+MAGIC = b"CBND"
+VERSION = 1
+PREAMBLE = struct.Struct(">4sBI")
+BUNDLE_NAME = "corpus.bundle"
+# Word counts and course codes the Lambda spell-corrects queries against, written next to the bundle
+VOCABULARY_NAME = "query_vocabulary.json"
+
+class BundleError(Exception):
+    pass
+
+def build_bundle(files, compress=True):
+    # files: {name: bytes} in the order the sections should be written
+    sections, payloads, offset = [], [], 0
+    for name, data in files.items():
+        payload, compression = data, "none"
+        if compress:
+            packed = zlib.compress(data, 9)
+            # Tiny files can grow when compressed; store those as-is
+            if len(packed) < len(data):
+                payload, compression = packed, "zlib"
+        sections.append({
+            "name": name,
+            "offset": offset,
+            "length": len(payload),
+            "size": len(data),
+            "crc32": zlib.crc32(data),
+            "compression": compression
+        })
+        payloads.append(payload)
+        offset += len(payload)
+
+    toc = json.dumps({"sections": sections}, separators=(",", ":")).encode("utf-8")
+    return PREAMBLE.pack(MAGIC, VERSION, len(toc)) + toc + b"".join(payloads)
+
+def header_length(prefix):
+    # Total bytes of preamble + TOC, readable from the first PREAMBLE.size bytes
+    if len(prefix) < PREAMBLE.size:
+        raise BundleError("Bundle is shorter than its preamble")
+    magic, version, toc_length = PREAMBLE.unpack_from(prefix)
+    if magic != MAGIC:
+        raise BundleError("Not a corpus bundle")
+    if version != VERSION:
+        raise BundleError(f"Unsupported bundle version {version}")
+    return PREAMBLE.size + toc_length
+
+def parse_toc(header):
+    # Returns ({name: section}, data_start) where data_start is the absolute offset of the first section
+    total = header_length(header)
+    if len(header) < total:
+        raise BundleError("Bundle header is truncated")
+    try:
+        toc = json.loads(header[PREAMBLE.size:total].decode("utf-8"))
+        return {section["name"]: section for section in toc["sections"]}, total
+    except (ValueError, KeyError, TypeError) as e:
+        raise BundleError(f"Bundle TOC is unreadable: {e}")
+
+def inflate(decompressor, block, max_length):
+    # JSON compresses ~10x, so cap each output piece instead of inflating a whole block at once
+    while block:
+        data = decompressor.decompress(block, max_length)
+        block = decompressor.unconsumed_tail
+        yield data
+
+def iter_section_blocks(section, payload_blocks, max_length=64 * 1024):
+    # Decompresses a section payload block by block and verifies its checksum at the end
+    decompressor = zlib.decompressobj() if section["compression"] == "zlib" else None
+    crc, size = 0, 0
+    for block in payload_blocks:
+        for data in inflate(decompressor, block, max_length) if decompressor else [block]:
+            crc, size = zlib.crc32(data, crc), size + len(data)
+            if data:
+                yield data
+    if decompressor:
+        data = decompressor.flush()
+        crc, size = zlib.crc32(data, crc), size + len(data)
+        if data:
+            yield data
+    if crc != section["crc32"] or size != section["size"]:
+        raise BundleError(f"Checksum mismatch in section {section['name']}")
+
+def decode_section(section, payload):
+    return b"".join(iter_section_blocks(section, [payload]))
+
+def read_exact(stream, length, block_size=64 * 1024):
+    # Yields exactly length bytes from a file-like stream, in blocks of at most block_size
+    while length > 0:
+        block = stream.read(min(block_size, length))
+        if not block:
+            raise BundleError("Bundle ended before its last section")
+        length -= len(block)
+        yield block
+
+def read_header(stream):
+    # Reads preamble + TOC off the front of a bundle stream; the stream is left at the first section
+    header = b"".join(read_exact(stream, PREAMBLE.size))
+    header += b"".join(read_exact(stream, header_length(header) - len(header)))
+    return parse_toc(header)
+
+# ---------- QUERY VOCABULARY ----------
+
+def build_vocabulary(files):
+    words, course_codes = Counter(), set()
+    for data in files.values():
+        text = data.decode("utf-8")
+        words.update(word for word in re.findall(r"[a-z]+", text.lower()) if len(word) > 2)
+        course_codes.update(re.findall(r"\b[A-Z]{2,4}\d{3,4}\b", text))
+    return {"words": dict(words.most_common()), "course_codes": sorted(course_codes)}
+
+# ---------- CLI ----------
+
+def read_department_dir(directory):
+    # The vocabulary from an earlier build is an output, not part of the corpus
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".json") and name != VOCABULARY_NAME)
+    files = {}
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as f:
+            files[name] = f.read()
+    return files
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack a department's JSON files into one corpus bundle")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help=f"build a bundle and {VOCABULARY_NAME} from a directory of .json files")
+    build.add_argument("directory")
+    build.add_argument("-o", "--output", help=f"output file (default: <directory>/{BUNDLE_NAME})")
+    build.add_argument("--no-compress", action="store_true", help="store every section uncompressed")
+    build.add_argument("--upload", metavar="S3_URI", help="also upload, e.g. s3://college-ai-data/cse/")
+
+    show = commands.add_parser("list", help="print the table of contents of a bundle")
+    show.add_argument("bundle")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        files = read_department_dir(args.directory)
+        if not files:
+            print(f"No .json files in {args.directory}", file=sys.stderr)
+            return 1
+        bundle = build_bundle(files, compress=not args.no_compress)
+        output = args.output or os.path.join(args.directory, BUNDLE_NAME)
+        with open(output, "wb") as f:
+            f.write(bundle)
+        raw_size = sum(len(data) for data in files.values())
+        print(f"Wrote {output}: {len(files)} sections, {raw_size} → {len(bundle)} bytes")
+
+        vocabulary = json.dumps(build_vocabulary(files), separators=(",", ":")).encode("utf-8")
+        vocabulary_output = os.path.join(os.path.dirname(output) or ".", VOCABULARY_NAME)
+        with open(vocabulary_output, "wb") as f:
+            f.write(vocabulary)
+        print(f"Wrote {vocabulary_output}: {len(vocabulary)} bytes")
+
+        if args.upload:
+            import boto3
+            client = boto3.client("s3")
+            bucket, _, prefix = args.upload[len("s3://"):].partition("/")
+            for name, body in ((BUNDLE_NAME, bundle), (VOCABULARY_NAME, vocabulary)):
+                key = prefix.rstrip("/") + "/" + name if prefix else name
+                client.put_object(Bucket=bucket, Key=key, Body=body)
+                print(f"Uploaded to s3://{bucket}/{key}")
+
+    elif args.command == "list":
+        with open(args.bundle, "rb") as f:
+            data = f.read()
+        sections, data_start = parse_toc(data)
+        print(f"{'section':34} {'offset':>8} {'stored':>8} {'size':>8} {'compression':>11}")
+        for name, section in sections.items():
+            print(f"{name:34} {data_start + section['offset']:8} {section['length']:8} "
+                  f"{section['size']:8} {section['compression']:>11}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
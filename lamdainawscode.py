@@ -1,22 +1,105 @@
+import codecs
+import heapq
+import itertools
 import json
+import math
+import os
 import boto3
 import time
 import re
+import zlib
+from botocore.config import Config
 from collections import Counter
+from concurrent.futures import TimeoutError as FutureTimeout, wait
 from string import punctuation
 
+from corpus_bundle import (
+    BUNDLE_NAME, VOCABULARY_NAME, BundleError, header_length, iter_section_blocks, parse_toc, read_exact,
+    read_header
+)
+from request_profiler import ProfilingThreadPoolExecutor, wrap_handler
+
+# Latency budget: API Gateway gives up after 29s, so answer well before that
+REQUEST_BUDGET_SECONDS = float(os.environ.get("REQUEST_BUDGET_SECONDS", "20"))
+# Time kept back after the Bedrock wait to build and return an extractive answer
+FALLBACK_RESERVE_SECONDS = float(os.environ.get("FALLBACK_RESERVE_SECONDS", "1"))
+# Below this, Bedrock is not called at all; only calls given at least this long count against the breaker
+BEDROCK_MIN_SECONDS = float(os.environ.get("BEDROCK_MIN_SECONDS", "1"))
+# Circuit breaker: stop calling Bedrock after repeated failures, retry after a cool-down
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get("BREAKER_COOLDOWN_SECONDS", "30"))
+# Corpus bundles: one S3 object per department instead of one per file (see corpus_bundle.py)
+USE_CORPUS_BUNDLE = os.environ.get("USE_CORPUS_BUNDLE", "true").lower() == "true"
+BUNDLE_TOC_TTL_SECONDS = float(os.environ.get("BUNDLE_TOC_TTL_SECONDS", "300"))
+BUNDLE_HEADER_PREFETCH = 4096
+# The bundle stands in for the plain <dept>/*.json objects; with this on, a plain object uploaded
+# after the bundle makes the department fall back to plain files until the bundle is rebuilt
+BUNDLE_FRESHNESS_CHECK = os.environ.get("BUNDLE_FRESHNESS_CHECK", "true").lower() == "true"
+# Typo correction and semester/course-code canonicalization before routing
+NORMALIZE_QUERIES = os.environ.get("NORMALIZE_QUERIES", "true").lower() == "true"
+SPELLING_INDEX_TTL_SECONDS = float(os.environ.get("SPELLING_INDEX_TTL_SECONDS", "3600"))
+# Minimum similarity for answering straight from faqs.json instead of asking Claude
+FAQ_MATCH_THRESHOLD = float(os.environ.get("FAQ_MATCH_THRESHOLD", "0.55"))
+# Departments searched for department=all (same list as the CollegeBot.jsx dropdown)
+DEPARTMENTS = [d.strip() for d in os.environ.get("DEPARTMENTS", "cse,it,csbs,aids").split(",") if d.strip()]
+# Share of the remaining budget a fan-out search may spend before merging whatever has arrived
+FANOUT_RETRIEVAL_SHARE = float(os.environ.get("FANOUT_RETRIEVAL_SHARE", "0.5"))
+
 # AWS Clients
 s3 = boto3.client("s3")
-bedrock = boto3.client("bedrock-runtime", region_name="us-east-1")
+bedrock = boto3.client(
+    "bedrock-runtime",
+    region_name="us-east-1",
+    config=Config(read_timeout=REQUEST_BUDGET_SECONDS, retries={"max_attempts": 2})
+)
+
+# Bedrock calls run here so the handler can stop waiting at the deadline
+bedrock_pool = ProfilingThreadPoolExecutor(max_workers=4)
+# Per-department retrieval for department=all / comma-list questions
+shard_pool = ProfilingThreadPoolExecutor(max_workers=8)
 
 # Stopwords for filtering
 STOPWORDS = set("""
 a an the and or in on of for with to from by at is was as are be this that which it its has have not their
 """.split())
 
+# ---------- ROUTING KEYWORDS ----------
+
+FACULTY_KEYWORDS = ["faculty", "professor", "staff", "teacher", "hod"]
+PROJECT_KEYWORDS = [
+    "project topics", "project ideas", "mini project", "final year project", "domain projects",
+    "ai project", "iot project", "cloud project", "data science project", "cybersecurity project",
+    "blockchain project", "web development project", "mobile app project"
+]
+INDUSTRY_KEYWORDS = [
+    "industry project", "industry projects", "company", "companies",
+    "internship", "internships", "collaboration", "collaborations",
+    "geons", "students involved",
+    "duration", "status"
+]
+FAQ_KEYWORDS = ["vision", "mission", "outcome", "objectives", "goal", "department aim"]
+IMPORTANT_KEYWORDS = [
+    "important question", "important questions link", "important links", "youtube links",
+    "video links", "question links", "sem videos", "semester videos", "unit links"
+]
+SYLLABUS_KEYWORDS = [
+    "semester", "syllabus", "unit", "lesson", "topics", "subjects","units",
+    "second sem", "third sem", "first sem", "fourth sem", "fifth sem",
+    "sixth sem", "seventh sem", "eighth sem", "sem i", "sem ii", "sem iii",
+    "sem iv", "sem v", "sem vi", "sem vii", "sem viii"
+]
+# Words matched inline in lambda_handler rather than through one of the lists above
+INLINE_ROUTING_WORDS = [
+    "conference", "paper", "authors", "project", "tell me about", "list", "all", "display", "show",
+    "elective courses", "open elective", "professional elective"
+]
+
 # ---------- UTILITIES ----------
 
 def read_file_from_s3(bucket, key):
+    section = read_bundle_section(bucket, key)
+    if section is not None:
+        return section
     print(f"Reading file: {key}")
     obj = s3.get_object(Bucket=bucket, Key=key)
     return obj['Body'].read().decode('utf-8')
@@ -49,27 +132,768 @@ def find_best_chunks(text, question, top_n=3):
     combined = "\n\n".join(best_chunks)
     return combined[:6000]
 
-def ask_claude(context, question):
+# ---------- CORPUS BUNDLES ----------
+
+# Bundle key -> {"fetched_at", "sections", "data_start"}; cached across warm invocations.
+# "sections" is None when the department has no usable bundle and plain files are read instead.
+bundle_tocs = {}
+
+def split_key(key):
+    prefix, _, name = key.rpartition("/")
+    return (prefix + "/" if prefix else ""), name
+
+def cache_bundle_toc(bundle_key, sections, data_start):
+    entry = {"fetched_at": time.monotonic(), "sections": sections, "data_start": data_start}
+    bundle_tocs[bundle_key] = entry
+    return entry
+
+def cached_bundle_toc(bundle_key):
+    entry = bundle_tocs.get(bundle_key)
+    if entry and time.monotonic() - entry["fetched_at"] < BUNDLE_TOC_TTL_SECONDS:
+        return entry
+    return None
+
+def s3_error_code(error):
+    # botocore's ClientError (and the local stand-ins) carry the S3 error code in .response
+    response = getattr(error, "response", None)
+    return response.get("Error", {}).get("Code") if isinstance(response, dict) else None
+
+def object_missing(error):
+    return s3_error_code(error) in ("NoSuchKey", "404")
+
+def bundle_unusable(error):
+    # Worth remembering for BUNDLE_TOC_TTL_SECONDS: the bundle is absent or not a valid bundle
+    return isinstance(error, BundleError) or object_missing(error)
+
+def bundle_is_stale(bucket, prefix, sections):
+    # One ListObjectsV2 per TOC fetch: is any plain file newer than the bundle built from it?
+    if not BUNDLE_FRESHNESS_CHECK:
+        return False
+    try:
+        listing = s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
+    except Exception as e:
+        print("Could not check bundle freshness, trusting the bundle:", str(e))
+        return False
+    modified = {obj["Key"][len(prefix):]: obj["LastModified"] for obj in listing.get("Contents", [])}
+    built = modified.get(BUNDLE_NAME)
+    newer = sorted(name for name in sections if built and name in modified and modified[name] > built)
+    if newer:
+        print(f"Bundle at {prefix + BUNDLE_NAME} is older than {', '.join(newer)}; rebuild it with corpus_bundle.py")
+    return bool(newer)
+
+def get_bundle_toc(bucket, prefix):
+    bundle_key = prefix + BUNDLE_NAME
+    entry = cached_bundle_toc(bundle_key)
+    if entry:
+        return entry
+    try:
+        print(f"Reading bundle header: {bundle_key}")
+        header = s3.get_object(
+            Bucket=bucket, Key=bundle_key, Range=f"bytes=0-{BUNDLE_HEADER_PREFETCH - 1}"
+        )['Body'].read()
+        total = header_length(header)
+        if total > len(header):
+            header += s3.get_object(
+                Bucket=bucket, Key=bundle_key, Range=f"bytes={len(header)}-{total - 1}"
+            )['Body'].read()
+        sections, data_start = parse_toc(header)
+        if bundle_is_stale(bucket, prefix, sections):
+            sections, data_start = None, 0
+    except Exception as e:
+        print(f"No usable bundle at {bundle_key}, reading plain files:", str(e))
+        if not bundle_unusable(e):
+            # Throttling or a timeout: read plain files this time, try the bundle again next request
+            return {"fetched_at": time.monotonic(), "sections": None, "data_start": 0}
+        sections, data_start = None, 0
+    return cache_bundle_toc(bundle_key, sections, data_start)
+
+def read_bundle_section(bucket, key):
+    # One byte-range GET for just this file's section; None means "read the plain object"
+    if not USE_CORPUS_BUNDLE:
+        return None
+    prefix, name = split_key(key)
+    bundle_key = prefix + BUNDLE_NAME
+    for attempt in range(2):
+        toc = get_bundle_toc(bucket, prefix)
+        if not toc["sections"] or name not in toc["sections"]:
+            return None
+        section = toc["sections"][name]
+        start = toc["data_start"] + section["offset"]
+        print(f"Reading section: {name} from {bundle_key}")
+        try:
+            body = s3.get_object(
+                Bucket=bucket, Key=bundle_key, Range=f"bytes={start}-{start + section['length'] - 1}"
+            )['Body']
+            return "".join(decode_blocks(iter_section_blocks(section, iter_body_blocks(body))))
+        except Exception as e:
+            # The bundle was rebuilt since its TOC was cached: a bad checksum, or a range past
+            # the end of a now smaller object. Refetch the header once.
+            if not isinstance(e, (BundleError, zlib.error)) and s3_error_code(e) != "InvalidRange":
+                raise
+            print("Stale bundle section:", str(e))
+            bundle_tocs.pop(bundle_key, None)
+    return None
+
+def open_bundle(bucket, prefix):
+    # One GET for the whole department; only the header is read here, sections are streamed later
+    if not USE_CORPUS_BUNDLE:
+        return None
+    bundle_key = prefix + BUNDLE_NAME
+    entry = cached_bundle_toc(bundle_key)
+    if entry and entry["sections"] is None:
+        return None
+    try:
+        print(f"Reading bundle: {bundle_key}")
+        body = s3.get_object(Bucket=bucket, Key=bundle_key)['Body']
+        sections, data_start = read_header(body)
+    except Exception as e:
+        print(f"No usable bundle at {bundle_key}, reading plain files:", str(e))
+        if bundle_unusable(e):
+            cache_bundle_toc(bundle_key, None, 0)
+        return None
+    # A TOC still cached from get_bundle_toc was checked when it was fetched
+    if not entry and bundle_is_stale(bucket, prefix, sections):
+        body.close()
+        cache_bundle_toc(bundle_key, None, 0)
+        return None
+    cache_bundle_toc(bundle_key, sections, data_start)
+    return {"body": body, "sections": sections}
+
+def iter_bundle_sections(bundle, names):
+    # Yields (name, text blocks) for the wanted sections in bundle order, reading the body front to back
+    # and skipping sections nobody asked for, so at most one block is held at a time
+    body, wanted, position = bundle["body"], set(names), 0
+    try:
+        for section in sorted(bundle["sections"].values(), key=lambda section: section["offset"]):
+            if not wanted:
+                break
+            if section["name"] not in wanted:
+                continue
+            for _ in read_exact(body, section["offset"] - position):
+                pass
+            blocks = read_exact(body, section["length"])
+            yield section["name"], decode_blocks(iter_section_blocks(section, blocks))
+            # Whatever the consumer left unread still has to come off the body
+            for _ in blocks:
+                pass
+            position = section["offset"] + section["length"]
+            wanted.discard(section["name"])
+    finally:
+        body.close()
+
+# ---------- STREAMING RETRIEVAL ----------
+
+def iter_body_blocks(body, block_size=64 * 1024):
+    while True:
+        block = body.read(block_size)
+        if not block:
+            break
+        yield block
+
+def decode_blocks(blocks):
+    # Incremental decode, so a multi-byte character split across blocks is handled
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for block in blocks:
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+def stream_file_from_s3(bucket, key):
+    # Yields decoded text blocks without ever holding the whole object
+    print(f"Streaming file: {key}")
+    body = s3.get_object(Bucket=bucket, Key=key)['Body']
+    yield from decode_blocks(iter_body_blocks(body))
+
+def stream_corpus(bucket, keys, deadline=None):
+    # One block stream per file; stops early when the deadline gets close.
+    # Files in the department bundle come first, in bundle order, off a single GET.
+    prefix = split_key(keys[0])[0] if keys else ""
+    bundle = open_bundle(bucket, prefix) if len(keys) > 1 else None
+    bundled = {key for key in keys
+               if bundle and split_key(key)[0] == prefix and split_key(key)[1] in bundle["sections"]}
+    if bundle and not bundled:
+        bundle["body"].close()
+    sources = itertools.chain(
+        iter_bundle_sections(bundle, [split_key(key)[1] for key in bundled]) if bundled else (),
+        ((key, stream_file_from_s3(bucket, key)) for key in keys if key not in bundled)
+    )
+    for i, (name, blocks) in enumerate(sources):
+        if i and time_left(deadline) < FALLBACK_RESERVE_SECONDS * 2:
+            print(f"Deadline near, skipping remaining files from {name}")
+            return
+        yield blocks
+
+def iter_chunks(blocks, chunk_size=1000, overlap=200):
+    # Same windows as chunk_text, but over a stream of blocks from a single source
+    buffer, start = "", 0
+    for block in blocks:
+        buffer = buffer[start:] + block
+        start = 0
+        while len(buffer) - start >= chunk_size:
+            yield buffer[start:start + chunk_size]
+            start += chunk_size - overlap
+    if start < len(buffer):
+        yield buffer[start:]
+
+def top_chunks(sources, question_tokens, top_n=3):
+    # Scores chunks as they arrive and keeps only the top_n in a min-heap; best first
+    heap = []
+    for seq, chunk in enumerate(chunk for source in sources for chunk in iter_chunks(source)):
+        # -seq makes earlier chunks win ties, like the stable sort in find_best_chunks
+        entry = (score_chunk(chunk, question_tokens), -seq, chunk)
+        if len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heappushpop(heap, entry)
+    return sorted(heap, reverse=True)
+
+def find_best_chunks_in_stream(sources, question, top_n=3):
+    best_chunks = [chunk for _, _, chunk in top_chunks(sources, tokenize(question), top_n)]
+    combined = "\n\n".join(best_chunks)
+    return combined[:6000]
+
+# ---------- CROSS-DEPARTMENT FAN-OUT ----------
+
+# Fan-out chunks carry their department as a plain-text first line
+PROVENANCE_PREFIX = "Department: "
+
+def parse_departments(value):
+    value = (value or "cse").strip().lower()
+    if value == "all":
+        return list(DEPARTMENTS)
+    departments = []
+    for department in value.split(","):
+        department = department.strip()
+        if department and department not in departments:
+            departments.append(department)
+    return departments or ["cse"]
+
+def split_provenance(part):
+    if part.startswith(PROVENANCE_PREFIX):
+        label, _, body = part.partition("\n")
+        return label, body
+    return None, part
+
+def find_best_chunks_across_departments(bucket, departments, filenames, question, deadline=None, top_n=3):
+    # Each department is searched on its own worker; the per-shard top_n lists are merged with a heap
+    question_tokens = tokenize(question)
+    shards = {}
+    for department in departments:
+        sources = stream_corpus(bucket, [f"{department}/{name}" for name in filenames], deadline)
+        shards[shard_pool.submit(top_chunks, sources, question_tokens, top_n)] = department
+
+    # Retrieval gets its own share of what is left, so the merged context still has time for Claude
+    timeout = (time_left(deadline) - FALLBACK_RESERVE_SECONDS) * FANOUT_RETRIEVAL_SHARE
+    done, not_done = wait(shards, timeout=None if deadline is None else max(0, timeout))
+    for future in not_done:
+        # Shards still queued behind busy workers are dropped; running ones finish in the background
+        future.cancel()
+        print(f"Deadline near, skipping department {shards[future]}")
+
+    candidates = []
+    for future in done:
+        department = shards[future]
+        try:
+            for score, seq, chunk in future.result():
+                # Order ties by department order, then by position within the department
+                candidates.append((score, -departments.index(department), seq, department, chunk))
+        except Exception as e:
+            print(f"Search failed for department {department}:", str(e))
+
+    best = heapq.nlargest(top_n, candidates, key=lambda entry: entry[:3])
+    combined = "\n\n".join(f"{PROVENANCE_PREFIX}{department.upper()}\n{chunk}" for *_, department, chunk in best)
+    return combined[:6000]
+
+# ---------- CONTEXT SERIALIZATION ----------
+
+# Fields that never help answer a question but still cost prompt tokens
+IRRELEVANT_FIELDS = {"id", "_id", "photo", "image", "image_url", "profile_pic", "created_at", "updated_at"}
+
+# One JSON lexeme: a (possibly unterminated) string, a structural char, or a bare literal
+JSON_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)("?)|([{}\[\],:])|([^\s{}\[\],:"]+)')
+# A string value holding a JSON array or object, as opposed to text such as "[Draft] title"
+NESTED_JSON = re.compile(r'[\[{]\s*["{\[]')
+
+def estimate_tokens(text):
+    # Claude averages roughly 4 characters per token on English and JSON text
+    return (len(text) + 3) // 4
+
+def decode_json_string(raw):
+    try:
+        return json.loads('"' + raw + '"')
+    except ValueError:
+        # Chunk boundaries can cut an escape sequence in half
+        return raw.replace('\\"', '"').replace("\\n", " ").replace("\\", "")
+
+def compact_json_text(text):
+    # Chunks are cut at arbitrary offsets; if the first quote closes a string we started inside one
+    first_quote = text.find('"')
+    if first_quote != -1 and text[first_quote + 1:].lstrip()[:1] in (",", ":", "}", "]"):
+        text = '"' + text
+
+    lines = []
+    field, values, pending = None, [], None
+
+    def flush(heading=False):
+        nonlocal field, values
+        kept = [v for v in values if v not in ("", "null")]
+        if field is not None and field.lower() in IRRELEVANT_FIELDS:
+            kept = []
+        label = field.replace("_", " ") if field is not None else None
+        if kept:
+            lines.append(f"{label}: {'; '.join(kept)}" if label else "; ".join(kept))
+        elif heading and label:
+            lines.append(f"{label}:")
+        field, values = None, []
+
+    for match in JSON_TOKEN.finditer(text):
+        string, _, structural, literal = match.groups()
+        if structural == ":":
+            if pending is not None:
+                flush()
+                field, pending = pending, None
+        elif structural in ("{", "}"):
+            if pending is not None:
+                values.append(pending)
+                pending = None
+            if structural == "{":
+                # Keep nested headings (e.g. semester > course code) together with their record
+                if lines and lines[-1] != "" and not lines[-1].endswith(":"):
+                    lines.append("")
+                flush(heading=True)
+            else:
+                flush()
+                if lines and lines[-1] != "":
+                    lines.append("")
+        elif structural is not None:
+            if pending is not None:
+                values.append(pending)
+                pending = None
+        else:
+            if pending is not None:
+                values.append(pending)
+            if string is not None:
+                value = re.sub(r"\s+", " ", decode_json_string(string)).strip()
+                # Nested JSON stored as an escaped string, e.g. faculty Achievements
+                if NESTED_JSON.match(value):
+                    value = "; ".join(line for line in compact_json_text(value).splitlines() if line)
+                pending = value
+            else:
+                pending = literal
+
+    if pending is not None:
+        values.append(pending)
+    flush()
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+def compact_part(part):
+    label, body = split_provenance(part)
+    compact = compact_json_text(body)
+    return f"{label}\n{compact}" if label else compact
+
+def serialize_context(context):
+    # Turn retrieved raw JSON chunks into dense "field: value" lines before prompting
+    compact = "\n\n".join(
+        compact_part(part) for part in context.split("\n\n") if part.strip()
+    )
+    raw_tokens = estimate_tokens(context)
+    compact_tokens = estimate_tokens(compact)
+    print(f"Context tokens: {raw_tokens} → {compact_tokens} (saved {raw_tokens - compact_tokens})")
+    return compact
+
+# ---------- DEADLINE & FALLBACK ----------
+
+# Survives across warm invocations of the same container
+breaker_state = {"failures": 0, "opened_at": None}
+
+class BedrockSkipped(Exception):
+    # Too little time left to call Bedrock at all; says nothing about Bedrock's health
+    pass
+
+def request_deadline(lambda_context=None):
+    budget = REQUEST_BUDGET_SECONDS
+    if lambda_context is not None and hasattr(lambda_context, "get_remaining_time_in_millis"):
+        budget = min(budget, lambda_context.get_remaining_time_in_millis() / 1000 - FALLBACK_RESERVE_SECONDS)
+    return time.monotonic() + budget
+
+def time_left(deadline):
+    if deadline is None:
+        return float("inf")
+    return deadline - time.monotonic()
+
+def breaker_allows_call():
+    opened_at = breaker_state["opened_at"]
+    if opened_at is None:
+        return True
+    # Half-open: let a single probe through once the cool-down has passed
+    if time.monotonic() - opened_at >= BREAKER_COOLDOWN_SECONDS:
+        breaker_state["opened_at"] = time.monotonic()
+        return True
+    return False
+
+def record_bedrock_result(ok):
+    if ok:
+        breaker_state["failures"] = 0
+        breaker_state["opened_at"] = None
+        return
+    breaker_state["failures"] += 1
+    if breaker_state["failures"] >= BREAKER_FAILURE_THRESHOLD:
+        print(f"Circuit breaker open after {breaker_state['failures']} Bedrock failures")
+        breaker_state["opened_at"] = time.monotonic()
+
+def extractive_answer(context, question, max_records=4):
+    # Answer straight from the top-ranked chunks, most relevant records first
+    question_tokens = set(tokenize(question))
+    records = []
+    for part in context.split("\n\n"):
+        label, body = split_provenance(part)
+        for record in compact_json_text(body).split("\n\n"):
+            if record.strip():
+                records.append(f"{label}\n{record}" if label else record)
+    ranked = sorted(records, key=lambda record: len(question_tokens & set(tokenize(record))), reverse=True)
+    header = "⚠️ Quick answer (the AI service is busy, so these are the most relevant records found):"
+    return header + "\n\n" + "\n\n".join(ranked[:max_records])
+
+def ask_claude(context, question, deadline=None):
+    context = serialize_context(context)
     prompt = f"""Use the following college info to answer this question:\n\n{context}\n\nQuestion: {question}"""
-    time.sleep(1)
-    response = bedrock.invoke_model(
-        modelId="anthropic.claude-3-sonnet-20240229-v1:0",
-        body=json.dumps({
-            "anthropic_version": "bedrock-2023-05-31",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 500
-        }),
-        contentType="application/json",
-        accept="application/json"
+
+    def invoke():
+        response = bedrock.invoke_model(
+            modelId="anthropic.claude-3-sonnet-20240229-v1:0",
+            body=json.dumps({
+                "anthropic_version": "bedrock-2023-05-31",
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 500
+            }),
+            contentType="application/json",
+            accept="application/json"
+        )
+        return json.loads(response['body'].read())['content'][0]['text']
+
+    budget = time_left(deadline) - FALLBACK_RESERVE_SECONDS
+    if budget < BEDROCK_MIN_SECONDS:
+        raise BedrockSkipped(f"Only {max(budget, 0):.1f}s left for Bedrock")
+    future = bedrock_pool.submit(invoke)
+    try:
+        return future.result(timeout=None if deadline is None else budget)
+    except FutureTimeout:
+        # A call still queued behind hung workers would otherwise run (and be billed) for nobody
+        future.cancel()
+        raise TimeoutError(f"Bedrock did not answer within {budget:.1f}s")
+
+def answer_with_claude(context, question, deadline=None):
+    # Claude when it is healthy and in time, otherwise an extractive answer
+    if breaker_allows_call():
+        try:
+            answer = ask_claude(context, question, deadline)
+            record_bedrock_result(True)
+            return {
+                "statusCode": 200,
+                "headers": {"Access-Control-Allow-Origin": "*"},
+                "body": json.dumps({"answer": answer})
+            }
+        except BedrockSkipped as e:
+            # Retrieval used up the budget; Bedrock was never called, so the breaker is left alone
+            print("Skipping Bedrock, using extractive answer:", str(e))
+        except Exception as e:
+            print("Bedrock failed, using extractive answer:", str(e))
+            record_bedrock_result(False)
+    else:
+        print("Circuit breaker open, using extractive answer.")
+
+    return {
+        "statusCode": 200,
+        "headers": {"Access-Control-Allow-Origin": "*"},
+        "body": json.dumps({"answer": extractive_answer(context, question), "extractive": True})
+    }
+
+# ---------- QUERY NORMALIZATION ----------
+
+# Common question words, so they are never "corrected" into corpus terms
+QUERY_WORDS = """
+what who whom whose which where when why how does did can could would should will shall please give tell
+about list show display details detail information available offered offer teach teaches taught handle
+handles work works working there here these those them they then than this that with from into your yours
+have having many much more most some same other such only also each every name names number year years
+know need want find help explain mention describe regarding related like best good time date held
+""".split()
+
+# Everyday English words a question may use that sit an edit or two from a keyword or corpus term
+# ("facility" → "faculty", "stuff" → "staff", "form" → "from"); they are never corrected
+COMMON_WORDS = set("""
+facility facilities stuff stiff stats state states status form forms head heads faster tech internet
+""".split())
+
+ABBREVIATIONS = {
+    "prof": "professor", "profs": "professors", "dept": "department", "fac": "faculty",
+    "syl": "syllabus", "sylb": "syllabus", "imp": "important", "ques": "questions", "qns": "questions",
+    "yt": "youtube", "proj": "project", "projs": "projects", "elec": "elective",
+    "ml": "machine learning", "dl": "deep learning", "nlp": "natural language processing",
+    "dbms": "database management systems", "info": "information", "abt": "about",
+}
+
+SEMESTER_NUMBERS = {
+    "1": 1, "1st": 1, "first": 1, "i": 1, "2": 2, "2nd": 2, "second": 2, "ii": 2,
+    "3": 3, "3rd": 3, "third": 3, "iii": 3, "4": 4, "4th": 4, "fourth": 4, "iv": 4,
+    "5": 5, "5th": 5, "fifth": 5, "v": 5, "6": 6, "6th": 6, "sixth": 6, "vi": 6,
+    "7": 7, "7th": 7, "seventh": 7, "vii": 7, "8": 8, "8th": 8, "eighth": 8, "viii": 8,
+}
+SEMESTER_NUMBER = r"(\d(?:st|nd|rd|th)?|first|second|third|fourth|fifth|sixth|seventh|eighth|viii|vii|vi|iv|v|iii|ii|i)"
+# "sem3", "sem-3", "sem iii", "semester 3" and "3rd sem", "third semester"
+SEMESTER_AFTER = re.compile(r"\b(?:semester|sems?)\s*[-_.]?\s*" + SEMESTER_NUMBER + r"\b")
+SEMESTER_BEFORE = re.compile(r"\b" + SEMESTER_NUMBER + r"\s+(?:semester|sem)\b")
+
+# "cs3401", "cse-3401", "CS 3401"
+COURSE_CODE = re.compile(r"\b([a-z]{2,4})(\s*[-_]?\s*)(\d{3,4})\b")
+
+# Dept prefix -> {"built_at", "index", "course_codes"}; cached across warm invocations
+query_indexes = {}
+# Words at least this long may be corrected by two edits, shorter ones by one
+LONG_WORD_LENGTH = 8
+
+def deletions(word, max_distance):
+    results, frontier = set(), {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+def edit_distance(a, b):
+    # Optimal string alignment distance: insertions, deletions, substitutions, adjacent swaps
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[len(b)]
+
+def build_spelling_index(word_counts, max_distance=2):
+    # SymSpell: every word is filed under all its deletions, so a lookup only
+    # generates the deletions of the query word instead of scanning the vocabulary
+    deletes = {}
+    for word in word_counts:
+        for key in deletions(word, max_distance) | {word}:
+            deletes.setdefault(key, []).append(word)
+    return {"words": word_counts, "deletes": deletes, "max_distance": max_distance}
+
+def known_word(word, words):
+    # Plurals and singulars of known words are not typos
+    return (word in words or word in COMMON_WORDS or word + "s" in words or
+            (word.endswith("s") and (word[:-1] in words or word[:-2] in words)))
+
+def correct_word(word, index):
+    if len(word) < 4 or not word.isalpha() or known_word(word, index["words"]):
+        return word
+    # A second edit only for long words; at 6-7 letters two edits reach other real words ("hostel" → "foster")
+    max_distance = 1 if len(word) < LONG_WORD_LENGTH else index["max_distance"]
+    best = None
+    for key in deletions(word, max_distance) | {word}:
+        for candidate in index["deletes"].get(key, ()):
+            # Typos rarely hit the first letter or change the length by more than one;
+            # "cell" → "tell" and "admission" → "mission" are different words, not misspellings
+            if candidate[0] != word[0] or abs(len(candidate) - len(word)) > 1:
+                continue
+            distance = edit_distance(word, candidate)
+            if distance <= max_distance:
+                # Closest first, then the word the corpus uses most
+                rank = (distance, -index["words"][candidate], candidate)
+                if best is None or rank < best:
+                    best = rank
+    return best[2] if best else word
+
+def routing_vocabulary():
+    counts = Counter()
+    for phrase in (FACULTY_KEYWORDS + PROJECT_KEYWORDS + INDUSTRY_KEYWORDS + FAQ_KEYWORDS +
+                   IMPORTANT_KEYWORDS + SYLLABUS_KEYWORDS + INLINE_ROUTING_WORDS + QUERY_WORDS):
+        counts.update(phrase.split())
+    return counts
+
+# Built once per container from the keyword lists above; needs no S3 reads
+routing_query_index = {"index": build_spelling_index(routing_vocabulary()), "course_codes": set()}
+
+def needs_corpus_vocabulary(question):
+    # Questions made only of routing words and short tokens ("list faculty", "sem 3 links")
+    # are normalized against the routing keywords alone and never wait on S3
+    text = question.lower()
+    return bool(COURSE_CODE.search(text)) or any(
+        len(word) >= 4 and not known_word(word, routing_query_index["index"]["words"]) and word not in ABBREVIATIONS
+        for word in re.findall(r"[a-z]+", text)
     )
-    return json.loads(response['body'].read())['content'][0]['text']
+
+def get_query_index(bucket, prefix, question, deadline=None):
+    # Routing keywords plus the department's precomputed query_vocabulary.json (see corpus_bundle.py)
+    if not needs_corpus_vocabulary(question):
+        return routing_query_index
+    entry = query_indexes.get(prefix)
+    if entry and time.monotonic() - entry["built_at"] < SPELLING_INDEX_TTL_SECONDS:
+        return entry
+    if time_left(deadline) < FALLBACK_RESERVE_SECONDS * 2:
+        return routing_query_index
+    counts, course_codes = routing_vocabulary(), set()
+    try:
+        print(f"Reading query vocabulary: {prefix + VOCABULARY_NAME}")
+        vocabulary = json.loads(s3.get_object(Bucket=bucket, Key=prefix + VOCABULARY_NAME)['Body'].read())
+        counts.update(vocabulary.get("words", {}))
+        course_codes.update(vocabulary.get("course_codes", []))
+    except Exception as e:
+        print("Query vocabulary unavailable, correcting against routing keywords only:", str(e))
+        if not object_missing(e):
+            # Throttling or a timeout: try again on the next request
+            return routing_query_index
+    entry = {"built_at": time.monotonic(), "index": build_spelling_index(counts), "course_codes": course_codes}
+    query_indexes[prefix] = entry
+    return entry
+
+def canonical_course_code(match, course_codes):
+    # Codes are matched in upper case as the corpus writes them but returned lower case,
+    # like the rest of the routing text ("cs3401" is found in "CS3401 Algorithms".lower())
+    letters, separator, digits = match.groups()
+    code = (letters + digits).upper()
+    if code in course_codes:
+        return code.lower()
+    # "cse3401" for CS3401: same number, department letters typed longer or shorter
+    similar = [known for known in course_codes if known.endswith(digits) and
+               (known[:-len(digits)].startswith(letters.upper()) or letters.upper().startswith(known[:-len(digits)]))]
+    if len(similar) == 1:
+        return similar[0].lower()
+    # Only glue "in 2021" into a code when it was typed as one token
+    return code.lower() if not separator else match.group(0)
+
+def canonical_semester(match):
+    return f"semester {SEMESTER_NUMBERS[match.group(1)]}"
+
+def normalize_query(question, entry):
+    text = question.lower()
+    text = COURSE_CODE.sub(lambda m: canonical_course_code(m, entry["course_codes"]), text)
+    text = re.sub(r"[a-z]+", lambda m: ABBREVIATIONS.get(m.group(0)) or correct_word(m.group(0), entry["index"]), text)
+    text = SEMESTER_AFTER.sub(canonical_semester, text)
+    text = SEMESTER_BEFORE.sub(canonical_semester, text)
+    return re.sub(r"\s+", " ", text).strip()
+
+# ---------- FAQ MATCHING ----------
+
+# faqs.json key -> {"version", "entries", "idf"}; rebuilt only when the file content changes
+faq_indexes = {}
+
+def faq_pairs(faq_data):
+    # Accepts [{"question", "answer"}], {"faqs": [...]} or {"vision": "...", "mission": "..."}
+    if isinstance(faq_data, dict):
+        for key, value in faq_data.items():
+            if key.lower() in ("faqs", "faq") and isinstance(value, list):
+                faq_data = value
+                break
+    if isinstance(faq_data, dict):
+        items = [{"question": key.replace("_", " "), "answer": value} for key, value in faq_data.items()]
+    else:
+        items = [{key.lower(): value for key, value in item.items()} for item in faq_data if isinstance(item, dict)]
+
+    pairs = []
+    for item in items:
+        question = item.get("question") or item.get("q")
+        answer = item.get("answer") or item.get("a")
+        if not question or not answer:
+            continue
+        if isinstance(answer, list):
+            answer = "\n".join(f"• {line}" for line in answer)
+        elif not isinstance(answer, str):
+            answer = compact_json_text(json.dumps(answer))
+        pairs.append((str(question), answer))
+    return pairs
+
+def faq_terms(text):
+    # Question words ("what", "tell", ...) and department names say nothing about which FAQ is meant;
+    # a question naming another department is kept off the fast path by other_departments_named
+    return [word for word in tokenize(text) if word not in QUERY_WORDS and word not in DEPARTMENTS]
+
+def trigrams(terms):
+    text = " " + " ".join(terms) + " "
+    return Counter(text[i:i + 3] for i in range(len(text) - 2))
+
+def cosine(a, b):
+    dot = sum(weight * b.get(key, 0) for key, weight in a.items())
+    if not dot:
+        return 0.0
+    return dot / (math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values())))
+
+def build_faq_index(pairs):
+    terms = [faq_terms(question) for question, _ in pairs]
+    words = [Counter(question_terms) for question_terms in terms]
+    document_frequency = Counter(word for counts in words for word in counts)
+    idf = {word: math.log((len(pairs) + 1) / (df + 1)) + 1 for word, df in document_frequency.items()}
+    entries = []
+    for (question, answer), question_terms, counts in zip(pairs, terms, words):
+        entries.append({
+            "question": question,
+            "answer": answer,
+            "words": {word: count * idf[word] for word, count in counts.items()},
+            "grams": trigrams(question_terms),
+        })
+    return {"entries": entries, "idf": idf}
+
+def get_faq_index(key, faq_text):
+    version = zlib.crc32(faq_text.encode("utf-8"))
+    cached = faq_indexes.get(key)
+    if cached and cached["version"] == version:
+        return cached
+    try:
+        pairs = faq_pairs(json.loads(faq_text))
+    except (ValueError, AttributeError) as e:
+        print("FAQ file could not be indexed:", str(e))
+        pairs = []
+    index = build_faq_index(pairs)
+    index["version"] = version
+    faq_indexes[key] = index
+    print(f"Indexed {len(pairs)} FAQs from {key}")
+    return index
+
+def match_faq(question, index):
+    # Lexical TF-IDF similarity plus character trigrams, which tolerate typos and word forms.
+    # Words no FAQ uses weigh as much as the rarest FAQ word, so extra specifics lower the score.
+    unknown_weight = max(index["idf"].values(), default=1.0)
+    terms = faq_terms(question)
+    query_words = {word: count * index["idf"].get(word, unknown_weight) for word, count in Counter(terms).items()}
+    query_grams = trigrams(terms)
+    best_score, best_entry = 0.0, None
+    for entry in index["entries"]:
+        score = 0.6 * cosine(query_words, entry["words"]) + 0.4 * cosine(query_grams, entry["grams"])
+        if score > best_score:
+            best_score, best_entry = score, entry
+    return best_score, best_entry
+
+# Department codes that are also everyday words ("how is it achieved"); they only name a
+# department in capitals or next to "department" / "dept"
+WORD_LIKE_DEPARTMENTS = {"it", "me", "is", "us", "am", "an", "as", "at"}
+
+def names_department(question, match):
+    word = match.group(0)
+    if word.lower() not in WORD_LIKE_DEPARTMENTS or (word.isupper() and not question.isupper()):
+        return True
+    before, after = question[:match.start()].lower(), question[match.end():].lower()
+    return bool(re.search(r"\b(?:department|dept)\.?\s+(?:of|for)\s+(?:the\s+)?$", before) or
+                re.match(r"\s*(?:department|dept)\b", after))
+
+def other_departments_named(question, department):
+    # faq_terms drops department names, so "vision of the IT department" would match CSE's vision FAQ;
+    # reads the original question, since capitals tell "IT" from "it"
+    return sorted({match.group(0).lower() for match in re.finditer(r"[A-Za-z]+", question)
+                   if match.group(0).lower() in DEPARTMENTS and match.group(0).lower() != department
+                   and names_department(question, match)})
 
 # ---------- MAIN HANDLER ----------
 
 def lambda_handler(event, context):
     # Safe access to query
     question = event.get("queryStringParameters", {}).get("q", "").strip()
-    department = event.get("queryStringParameters", {}).get("department", "cse")
+    # "cse", "cse,it" or "all"
+    departments = parse_departments(event.get("queryStringParameters", {}).get("department", "cse"))
+    department = departments[0]
     dept_prefix = department.lower() + "/"
 
     if not question:
@@ -78,6 +902,14 @@ def lambda_handler(event, context):
             "body": json.dumps({"error": "Missing query parameter 'q'"})
         }
 
+    # Each department is an S3 prefix read in parallel, so only configured ones are accepted
+    unknown = [d for d in departments if d not in DEPARTMENTS]
+    if unknown:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"Unknown department: {', '.join(unknown)}"})
+        }
+
     bucket = "college-ai-data"
     filenames = [
         "conferencepapers.json",
@@ -91,15 +923,27 @@ def lambda_handler(event, context):
         "important_questions_links.json"
     ]
     keys = [dept_prefix + name for name in filenames]
+    deadline = request_deadline(context)
 
 
 
     try:
+        # Several departments: one merged retrieval across all of them, a single Claude call
+        if len(departments) > 1:
+            print(f"→ Cross-department question detected: {', '.join(departments)}")
+            best_context = find_best_chunks_across_departments(bucket, departments, filenames, question, deadline)
+            return answer_with_claude(best_context, question, deadline)
+
+        # Routing and keyword tests see the normalized text; retrieval and Claude get the user's own words
         lower_q = question.lower()
+        if NORMALIZE_QUERIES:
+            normalized = normalize_query(question, get_query_index(bucket, dept_prefix, question, deadline))
+            if normalized != lower_q:
+                print(f"Normalized query: {question!r} → {normalized!r}")
+                lower_q = normalized
 
         # Faculty-related questions
-        faculty_keywords = ["faculty", "professor", "staff", "teacher", "hod"]
-        if any(word in lower_q for word in faculty_keywords):
+        if any(word in lower_q for word in FACULTY_KEYWORDS):
             print("→ Faculty-related question detected.")
             dept_prefix = department.lower() + "/"  # example: "cse/"
             faculty_text = read_file_from_s3(bucket, dept_prefix + "faculty.json")
@@ -149,41 +993,21 @@ Achievements:\n- {chr(10).join(json.loads(fac.get("Achievements", "[]")))}"""
                 }
 
             # If no match, fallback to Claude
-            combined_text = faculty_text
-            for key in keys:
-                if not key.endswith("faculty.json"):
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
+            other_keys = [key for key in keys if not key.endswith("faculty.json")]
+            sources = itertools.chain([[faculty_text]], stream_corpus(bucket, other_keys, deadline))
+            best_context = find_best_chunks_in_stream(sources, question)
+            return answer_with_claude(best_context, question, deadline)
 
 
         # Conference papers
         if "conference" in lower_q or "paper" in lower_q or "authors" in lower_q:
             print("→ Conference paper question detected.")
-            combined_text = read_file_from_s3(bucket, dept_prefix + "conferencepapers.json")+ "\n\n"
-            for key in keys:
-                if key != "conferencepapers.json":
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
+            primary = dept_prefix + "conferencepapers.json"
+            sources = stream_corpus(bucket, [primary] + [key for key in keys if key != primary], deadline)
+            best_context = find_best_chunks_in_stream(sources, question)
+            return answer_with_claude(best_context, question, deadline)
         # Project Topic Suggestions by Domain
-        project_keywords = [
-            "project topics", "project ideas", "mini project", "final year project", "domain projects",
-            "ai project", "iot project", "cloud project", "data science project", "cybersecurity project",
-            "blockchain project", "web development project", "mobile app project"
-        ]
-
-        if any(word in lower_q for word in project_keywords):
+        if any(word in lower_q for word in PROJECT_KEYWORDS):
             print("→ Project domain suggestion detected.")
             project_data = json.loads(read_file_from_s3(bucket, dept_prefix + "industrial_project_ideas.json"))
 
@@ -214,14 +1038,7 @@ Achievements:\n- {chr(10).join(json.loads(fac.get("Achievements", "[]")))}"""
                 "body": json.dumps({"answer": "\n".join(response_lines)})
             }
         # ✅ Industry Projects
-        industry_keywords = [
-            "industry project", "industry projects", "company", "companies",
-            "internship", "internships", "collaboration", "collaborations",
-            "geons", "students involved",
-            "duration", "status"
-        ]
-
-        if any(word in lower_q for word in industry_keywords) or "project" in lower_q or "tell me about" in lower_q or "list" in lower_q:
+        if any(word in lower_q for word in INDUSTRY_KEYWORDS) or "project" in lower_q or "tell me about" in lower_q or "list" in lower_q:
             print("→ Industry project question detected.")
 
             # Read the industry projects JSON
@@ -276,28 +1093,32 @@ Achievements:\n- {chr(10).join(json.loads(fac.get("Achievements", "[]")))}"""
 
 
         # FAQs and Vision/Mission
-        faq_keywords = ["vision", "mission", "outcome", "objectives", "goal", "department aim"]
-        if any(word in lower_q for word in faq_keywords):
+        if any(word in lower_q for word in FAQ_KEYWORDS):
             print("→ FAQ/vision/mission question detected.")
-            combined_text = read_file_from_s3(bucket, dept_prefix + "faqs.json") + "\n\n"
-            for key in keys:
-                if key != "faqs.json":
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
+            faqs_key = dept_prefix + "faqs.json"
+            faqs_text = read_file_from_s3(bucket, faqs_key)
+            score, faq = match_faq(lower_q, get_faq_index(faqs_key, faqs_text))
+            named = other_departments_named(question, department)
+            if named:
+                print(f"Question names {', '.join(named)}, not answering from {faqs_key}.")
+            elif faq and score >= FAQ_MATCH_THRESHOLD:
+                print(f"FAQ match ({score:.2f}): {faq['question']}")
+                return {
+                    "statusCode": 200,
+                    "headers": {"Access-Control-Allow-Origin": "*"},
+                    "body": json.dumps({"answer": faq["answer"]})
+                }
+            else:
+                print(f"No confident FAQ match (best {score:.2f}), asking Claude.")
+
+            # Let Claude answer from the FAQ file plus the rest of the corpus
+            other_keys = [key for key in keys if key != faqs_key]
+            sources = itertools.chain([[faqs_text]], stream_corpus(bucket, other_keys, deadline))
+            best_context = find_best_chunks_in_stream(sources, question)
+            return answer_with_claude(best_context, question, deadline)
         
         # 📘 Important Question Links (by semester or subject)
-        important_keywords = [
-            "important question", "important questions link", "important links", "youtube links",
-            "video links", "question links", "sem videos", "semester videos", "unit links"
-        ]
-
-        if any(word in lower_q for word in important_keywords):
+        if any(word in lower_q for word in IMPORTANT_KEYWORDS):
             print("→ Important question link request detected.")
             link_data = json.loads(read_file_from_s3(bucket, dept_prefix + "important_questions_links.json"))
 
@@ -354,14 +1175,7 @@ Achievements:\n- {chr(10).join(json.loads(fac.get("Achievements", "[]")))}"""
                 })
             }
         # Syllabus / Semester-wise Course Info
-        syllabus_keywords = [
-            "semester", "syllabus", "unit", "lesson", "topics", "subjects","units", 
-            "second sem", "third sem", "first sem", "fourth sem", "fifth sem", 
-            "sixth sem", "seventh sem", "eighth sem", "sem i", "sem ii", "sem iii",
-            "sem iv", "sem v", "sem vi", "sem vii", "sem viii"
-        ]
-
-        if any(word in lower_q for word in syllabus_keywords):
+        if any(word in lower_q for word in SYLLABUS_KEYWORDS):
             print("→ Syllabus or semester-wise question detected.")
             syllabus_text = read_file_from_s3(bucket, dept_prefix + "coursesyllabus.json")
             syllabus_data = json.loads(syllabus_text)
@@ -388,35 +1202,18 @@ Achievements:\n- {chr(10).join(json.loads(fac.get("Achievements", "[]")))}"""
                 }
 
             # 🔁 Fallback to Claude or LLM
-            combined_text = syllabus_text
-            for key in keys:
-                if key != "coursesyllabus.json":
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
+            other_keys = [key for key in keys if not key.endswith("coursesyllabus.json")]
+            sources = itertools.chain([[syllabus_text]], stream_corpus(bucket, other_keys, deadline))
+            best_context = find_best_chunks_in_stream(sources, question)
+            return answer_with_claude(best_context, question, deadline)
 
         # Course code (e.g., EP101)
-        if re.match(r"[A-Z]{2,4}\d{3}", question.strip().upper()):
+        if re.match(r"[A-Z]{2,4}\d{3}", lower_q.strip().upper()):
             print("→ Course code pattern detected.")
-            combined_text = (
-                read_file_from_s3(bucket, dept_prefix + "courses.json") + "\n\n" +
-                read_file_from_s3(bucket, dept_prefix + "elective_courses.json") + "\n\n"
-            )
-            for key in keys:
-                if key not in ["courses.json", "elective_courses.json"]:
-                    combined_text += read_file_from_s3(bucket, key) + "\n\n"
-            best_context = find_best_chunks(combined_text, question)
-            answer = ask_claude(best_context, question)
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"answer": answer})
-            }
+            primary = [dept_prefix + "courses.json", dept_prefix + "elective_courses.json"]
+            sources = stream_corpus(bucket, primary + [key for key in keys if key not in primary], deadline)
+            best_context = find_best_chunks_in_stream(sources, question)
+            return answer_with_claude(best_context, question, deadline)
 
         if "elective courses" in lower_q or "open elective" in lower_q or "professional elective" in lower_q:
             print("→ Elective courses query detected.")
@@ -444,19 +1241,9 @@ Achievements:\n- {chr(10).join(json.loads(fac.get("Achievements", "[]")))}"""
 
 
         # ✅ Default fallback if nothing matched
-        print("→ Default: combining all files.")
-        combined_text = ""
-        for key in keys:
-            combined_text += read_file_from_s3(bucket, key) + "\n\n"
-
-        best_context = find_best_chunks(combined_text, question)
-        answer = ask_claude(best_context, question)
-
-        return {
-            "statusCode": 200,
-            "headers": {"Access-Control-Allow-Origin": "*"},
-            "body": json.dumps({"answer": answer})
-        }
+        print("→ Default: searching all files.")
+        best_context = find_best_chunks_in_stream(stream_corpus(bucket, keys, deadline), question)
+        return answer_with_claude(best_context, question, deadline)
 
     except Exception as e:
         print("Error:", str(e))
@@ -465,3 +1252,7 @@ Achievements:\n- {chr(10).join(json.loads(fac.get("Achievements", "[]")))}"""
             "body": json.dumps({"error": str(e)})
         }
 
+# ---------- PROFILING ----------
+
+# Opt-in cProfile/tracemalloc reports (see request_profiler.py); unchanged handler when disabled
+lambda_handler = wrap_handler(lambda_handler, put_object=lambda **kwargs: s3.put_object(**kwargs))
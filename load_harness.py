@@ -0,0 +1,202 @@
+import argparse
+import importlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import lamdainawscode as bot
+from local_aws import LocalBedrock, LocalS3, current_request, install_stand_ins, make_department_corpus, percentile
+
+# ---------- REPLAY LOG ----------
+
+def load_log(path, default_department="cse"):
+    # One JSON object per line with "q" (or "question") and an optional "department"
+    entries = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = record.get("q") or record.get("question")
+            if question:
+                entries.append({"q": question, "department": record.get("department", default_department)})
+    return entries
+
+# ---------- REQUEST CAPTURE ----------
+
+class RequestOutput:
+    # Sends each request's print() output to its own stats so routes can be read back
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        stats = current_request.get()
+        if stats is None:
+            return self.stream.write(text)
+        stats.setdefault("output", []).append(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def route_of(output):
+    for line in "".join(output).splitlines():
+        if line.startswith("→ "):
+            label = re.sub(r"( question| request| query)? detected\.?$", "", line[2:])
+            return label.split(":")[0].lower()
+    return "none"
+
+# Fast-path replies that only say nothing was found; they are not answers
+NOT_FOUND = re.compile(r"no matching .* found|couldn't find", re.IGNORECASE)
+
+def reset_container():
+    # What a fresh Lambda container would not have: cached TOCs, query and FAQ indexes, breaker history
+    bot.bundle_tocs.clear()
+    bot.query_indexes.clear()
+    bot.faq_indexes.clear()
+    bot.breaker_state.update({"failures": 0, "opened_at": None})
+
+def measure_init_ms(s3, bedrock):
+    # Module import cost a cold start pays before the handler runs
+    start = time.perf_counter()
+    importlib.reload(bot)
+    init_ms = (time.perf_counter() - start) * 1000
+    install_stand_ins(bot, s3, bedrock)
+    return init_ms
+
+def serve(entry, cold, init_ms):
+    stats = {}
+    token = current_request.set(stats)
+    try:
+        if cold:
+            reset_container()
+        event = {"queryStringParameters": {"q": entry["q"], "department": entry["department"]}}
+        start = time.perf_counter()
+        try:
+            response = bot.lambda_handler(event, None)
+            status = response["statusCode"]
+            body = json.loads(response["body"])
+            extractive = body.get("extractive", False)
+            not_found = bool(NOT_FOUND.search(str(body.get("answer", ""))))
+        except Exception as e:
+            print("Harness error:", str(e))
+            status, extractive, not_found = 599, False, False
+        stats["latency_ms"] = (time.perf_counter() - start) * 1000 + (init_ms if cold else 0)
+    finally:
+        current_request.reset(token)
+    stats["route"] = route_of(stats.pop("output", []))
+    stats["status"] = status
+    stats["extractive"] = extractive
+    stats["not_found"] = not_found
+    return stats
+
+# ---------- REPORT ----------
+
+def summarize(results):
+    latencies = [r["latency_ms"] for r in results]
+    count = len(results)
+    return {
+        "requests": count,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "s3_calls_per_request": round(sum(r.get("s3_calls", 0) for r in results) / count, 2),
+        "s3_bytes_per_request": round(sum(r.get("s3_bytes", 0) for r in results) / count),
+        "bedrock_calls_per_request": round(sum(r.get("bedrock_calls", 0) for r in results) / count, 2),
+        "bedrock_input_tokens_per_request": round(sum(r.get("bedrock_input_tokens", 0) for r in results) / count, 1),
+        "bedrock_output_tokens_per_request": round(sum(r.get("bedrock_output_tokens", 0) for r in results) / count, 1),
+        # Answered without Bedrock or the extractive fallback, and not with a "nothing found" reply
+        "fast_path_share": round(sum(r.get("bedrock_calls", 0) == 0 and not r["extractive"] and r["status"] == 200
+                                     and not r["not_found"] for r in results) / count, 3),
+        "extractive": sum(r["extractive"] for r in results),
+        "errors": sum(r["status"] >= 500 for r in results),
+    }
+
+def run(entries, args):
+    departments = sorted({entry["department"] for entry in entries})
+    corpora = {department: make_department_corpus(args.scale, seed=i) for i, department in enumerate(departments)}
+    runs = []
+    for mode in args.modes:
+        for concurrency in args.concurrency:
+            s3 = LocalS3(corpora, bundle=args.bundle, latency=args.s3_latency, throttle_rate=args.s3_throttle)
+            bedrock = LocalBedrock(mode=args.bedrock_mode, latency=args.bedrock_latency,
+                                   throttle_rate=args.bedrock_throttle, answer_tokens=args.answer_tokens)
+            init_ms = measure_init_ms(s3, bedrock)
+            reset_container()
+            if mode == "warm":
+                # Prime each department's container state; these requests are not reported
+                for department in departments:
+                    serve({"q": "list faculty", "department": department}, False, 0)
+
+            workload = entries * args.repeat
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(lambda entry: serve(entry, mode == "cold", init_ms), workload))
+            wall = time.perf_counter() - start
+
+            routes = {}
+            for result in results:
+                routes.setdefault(result["route"], []).append(result)
+            runs.append({
+                "mode": mode,
+                "concurrency": concurrency,
+                "init_ms": round(init_ms, 2),
+                "throughput_rps": round(len(results) / wall, 2),
+                "overall": summarize(results),
+                "routes": {route: summarize(group) for route, group in sorted(routes.items())},
+            })
+    return runs
+
+def print_report(runs):
+    for result in runs:
+        print(f"\n{result['mode']} x{result['concurrency']}  init={result['init_ms']}ms  "
+              f"{result['throughput_rps']} req/s  fast path {result['overall']['fast_path_share']:.0%}")
+        print(f"  {'route':28} {'n':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'s3/req':>7} {'in tok':>7} {'out tok':>7}")
+        for route, row in list(result["routes"].items()) + [("ALL", result["overall"])]:
+            print(f"  {route[:28]:28} {row['requests']:4} {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} "
+                  f"{row['p99_ms']:8.1f} {row['s3_calls_per_request']:7} "
+                  f"{row['bedrock_input_tokens_per_request']:7} {row['bedrock_output_tokens_per_request']:7}")
+
+def parse_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a question log against lambda_handler with local AWS stand-ins")
+    parser.add_argument("--log", default="sample_questions.jsonl", help="JSON lines with q and department")
+    parser.add_argument("--output", default="load_results.json", help="where to write the JSON results")
+    parser.add_argument("--modes", type=parse_list, default=["cold", "warm"], help="comma list of cold,warm")
+    parser.add_argument("--concurrency", type=lambda v: parse_list(v, int), default=[1, 4], help="comma list")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the log this many times per run")
+    parser.add_argument("--scale", type=int, default=1, help="multiply the sample corpus size")
+    parser.add_argument("--bundle", action="store_true", help="serve departments as corpus bundles")
+    parser.add_argument("--s3-latency", type=float, default=0.02, help="seconds per S3 request")
+    parser.add_argument("--s3-throttle", type=float, default=0.0, help="share of S3 requests that fail")
+    parser.add_argument("--bedrock-mode", choices=["ok", "hang", "fail"], default="ok")
+    parser.add_argument("--bedrock-latency", type=float, default=1.5, help="seconds per Bedrock call")
+    parser.add_argument("--bedrock-throttle", type=float, default=0.0, help="share of Bedrock calls throttled")
+    parser.add_argument("--answer-tokens", type=int, default=150, help="output tokens per Bedrock answer")
+    parser.add_argument("--no-normalize", action="store_true", help="route raw queries (NORMALIZE_QUERIES=false)")
+    args = parser.parse_args(argv)
+
+    # Read by lamdainawscode when measure_init_ms reloads it
+    os.environ["NORMALIZE_QUERIES"] = "false" if args.no_normalize else "true"
+
+    entries = load_log(args.log)
+    if not entries:
+        print(f"No questions found in {args.log}", file=sys.stderr)
+        return 1
+
+    sys.stdout = RequestOutput(sys.stdout)
+    runs = run(entries, args)
+    print_report(runs)
+
+    with open(args.output, "w") as f:
+        json.dump({"config": vars(args), "runs": runs}, f, indent=2)
+    print(f"\nWrote {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
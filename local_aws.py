@@ -0,0 +1,209 @@
+import contextvars
+import io
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import corpus_bundle
+from request_profiler import ProfilingThreadPoolExecutor
+
+# ---------- SAMPLE CORPUS ----------
+# Synthetic department data with the same shapes as the files under s3://college-ai-data/<dept>/
+
+DOMAINS = ["AI", "IoT", "Cloud", "Data Science", "Cybersecurity", "Blockchain", "Web Development"]
+TOPICS = ["machine learning", "edge computing", "network security", "computer vision",
+          "distributed systems", "natural language processing", "embedded systems", "databases"]
+
+def make_department_corpus(scale=1, seed=7):
+    rng = random.Random(seed)
+    faculty = []
+    for i in range(40 * scale):
+        faculty.append({
+            "Name": f"Dr. Faculty {i}",
+            "Title": rng.choice(["Professor", "Associate Professor", "Assistant Professor"]),
+            "Email": f"faculty{i}@college.edu",
+            "Phone": rng.choice(["", f"98400{i:05d}"]),
+            "Qualification": "Ph.D. in Computer Science and Engineering",
+            "Research_Of_Interest": ", ".join(rng.sample(TOPICS, 3)),
+            "Achievements": json.dumps([f"Best paper award on {rng.choice(TOPICS)} ({2015 + j})" for j in range(3)]),
+            "Photo": f"https://college.edu/images/faculty{i}.jpg",
+        })
+
+    syllabus = {"CSE_Regulation_2021": {}}
+    for sem in range(1, 9):
+        subjects = {}
+        for j in range(6 * scale):
+            subjects[f"CS{sem}{j:03d}"] = {
+                "title": f"{rng.choice(TOPICS).title()} {j}",
+                "units": [f"Unit {u}: {rng.choice(TOPICS)} fundamentals and applications" for u in range(1, 6)],
+            }
+        syllabus["CSE_Regulation_2021"][f"Semester_{sem}"] = subjects
+
+    courses = [{"course_code": f"CS{3000 + i}", "course_name": f"{rng.choice(TOPICS).title()}",
+                "credits": rng.choice([3, 4]), "semester": rng.randint(1, 8)} for i in range(50 * scale)]
+    electives = [{"course_code": f"CCS{300 + i}", "course_name": f"{rng.choice(TOPICS).title()} Elective",
+                  "category": rng.choice(["PEC", "OEC"]), "credits": 3, "periods_per_week": "3-0-0"}
+                 for i in range(30 * scale)]
+    papers = [{"title": f"A study of {rng.choice(TOPICS)}", "authors": f"Dr. Faculty {rng.randint(0, 39)}, Student {i}",
+               "conference": "International Conference on Computing", "year": 2018 + i % 6, "doi": ""}
+              for i in range(60 * scale)]
+    faqs = [
+        {"question": "What is the vision of the department?",
+         "answer": "To be a centre of excellence in computer science education and research."},
+        {"question": "What is the mission of the department?",
+         "answer": "To impart quality education and foster innovation through industry collaboration."},
+        {"question": "What are the program educational objectives?",
+         "answer": "Graduates will excel in careers, pursue higher studies and act ethically."},
+        {"question": "What are the program outcomes?",
+         "answer": "Engineering knowledge, problem analysis, design of solutions and lifelong learning."},
+    ] * scale
+    industry = [{"project_name": f"Project {i}", "industry_name": f"Company {i % 12}",
+                 "students_involved": f"Student {i}, Student {i + 1}", "duration": "6 months",
+                 "status": rng.choice(["Completed", "Ongoing"])} for i in range(25 * scale)]
+    ideas = {domain: [f"{domain} based {rng.choice(TOPICS)} system {k}" for k in range(8 * scale)] for domain in DOMAINS}
+    links = {f"Semester {sem}": {f"Subject {sem}{k}": f"https://youtube.com/watch?v=s{sem}k{k}" for k in range(6 * scale)}
+             for sem in range(1, 9)}
+
+    return {
+        "conferencepapers.json": json.dumps(papers, indent=2),
+        "courses.json": json.dumps(courses, indent=2),
+        "elective_courses.json": json.dumps(electives, indent=2),
+        "faculty.json": json.dumps({"faculty": faculty}, indent=2),
+        "faqs.json": json.dumps(faqs, indent=2),
+        "industry_projects.json": json.dumps(industry, indent=2),
+        "coursesyllabus.json": json.dumps(syllabus, indent=2),
+        "industrial_project_ideas.json": json.dumps(ideas, indent=2),
+        "important_questions_links.json": json.dumps(links, indent=2),
+    }
+
+# ---------- PER-REQUEST ACCOUNTING ----------
+
+# Stats dict of the request being served; set by whoever drives lambda_handler
+current_request = contextvars.ContextVar("current_request", default=None)
+
+def record(field, amount=1):
+    stats = current_request.get()
+    if stats is not None:
+        stats[field] = stats.get(field, 0) + amount
+
+class ContextThreadPoolExecutor(ProfilingThreadPoolExecutor):
+    # Runs submitted work in the submitter's context, so Bedrock calls made on the
+    # handler's pool are still charged to the request that made them
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+# ---------- LOCAL AWS STAND-INS ----------
+
+class StandInError(Exception):
+    # Shaped like botocore's ClientError: the error code is in .response["Error"]["Code"]
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+class Throttled(StandInError):
+    pass
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+class LocalS3:
+    # Serves department corpora from memory through the get_object API the handler uses.
+    # corpora: {department: {filename: text}}
+    def __init__(self, corpora, bundle=False, latency=0.0, throttle_rate=0.0, seed=1):
+        self.objects = {}
+        # LastModified per key; every put is one second after the previous one
+        self.modified = {}
+        self.clock = itertools.count(1)
+        for department, files in corpora.items():
+            for name, text in files.items():
+                self.put(f"{department}/{name}", text.encode("utf-8"))
+            if bundle:
+                # What "corpus_bundle.py build" uploads: the bundle and its query vocabulary
+                raw = {name: text.encode("utf-8") for name, text in files.items()}
+                self.put(f"{department}/{corpus_bundle.BUNDLE_NAME}", corpus_bundle.build_bundle(raw))
+                vocabulary = json.dumps(corpus_bundle.build_vocabulary(raw)).encode("utf-8")
+                self.put(f"{department}/{corpus_bundle.VOCABULARY_NAME}", vocabulary)
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.bytes_sent = 0
+
+    def put(self, key, data):
+        self.objects[key] = data
+        self.modified[key] = EPOCH + timedelta(seconds=next(self.clock))
+
+    def request(self):
+        with self.lock:
+            self.calls += 1
+            throttled = self.rng.random() < self.throttle_rate
+        record("s3_calls")
+        time.sleep(self.latency)
+        if throttled:
+            raise Throttled("SlowDown", "Please reduce your request rate.")
+
+    def put_object(self, Bucket, Key, Body):
+        self.request()
+        self.put(Key, Body)
+
+    def list_objects_v2(self, Bucket, Prefix=""):
+        self.request()
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        return {"Contents": [{"Key": key, "LastModified": self.modified.get(key, EPOCH), "Size": len(self.objects[key])}
+                             for key in keys]}
+
+    def get_object(self, Bucket, Key, Range=None):
+        self.request()
+        if Key not in self.objects:
+            raise StandInError("NoSuchKey", f"The specified key does not exist: {Key}")
+        data = self.objects[Key]
+        if Range:
+            start, end = Range[len("bytes="):].split("-")
+            if int(start) >= len(data):
+                raise StandInError("InvalidRange", "The requested range is not satisfiable")
+            data = data[int(start):int(end) + 1]
+        with self.lock:
+            self.bytes_sent += len(data)
+        record("s3_bytes", len(data))
+        return {"Body": io.BytesIO(data)}
+
+class LocalBedrock:
+    # mode: "ok" answers after latency seconds, "hang" sleeps for hang_seconds, "fail" raises.
+    # In "ok" mode a throttle_rate share of calls still fail like a ThrottlingException.
+    def __init__(self, mode="ok", latency=0.05, hang_seconds=10, throttle_rate=0.0, answer_tokens=150, seed=2):
+        self.mode = mode
+        self.latency = latency
+        self.hang_seconds = hang_seconds
+        self.throttle_rate = throttle_rate
+        self.answer_tokens = answer_tokens
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def invoke_model(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+            throttled = self.rng.random() < self.throttle_rate
+        prompt = json.loads(kwargs["body"])["messages"][0]["content"]
+        record("bedrock_calls")
+        record("bedrock_input_tokens", (len(prompt) + 3) // 4)
+        if self.mode == "fail" or throttled:
+            raise Throttled("ThrottlingException", "Rate exceeded")
+        time.sleep(self.hang_seconds if self.mode == "hang" else self.latency)
+        answer = " ".join(["answer"] * self.answer_tokens)
+        record("bedrock_output_tokens", self.answer_tokens)
+        body = json.dumps({"content": [{"text": answer}]})
+        return {"body": io.BytesIO(body.encode("utf-8"))}
+
+def install_stand_ins(bot, s3, bedrock):
+    bot.s3 = s3
+    bot.bedrock = bedrock
+    bot.bedrock_pool = ContextThreadPoolExecutor(max_workers=bot.bedrock_pool._max_workers)
+    bot.shard_pool = ContextThreadPoolExecutor(max_workers=bot.shard_pool._max_workers)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,176 @@
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------- CONFIG ----------
+# Profiling is opt-in. With none of these set, wrap_handler returns the handler untouched.
+#   PROFILE_REQUESTS=true         profile every request
+#   PROFILE_SAMPLE_PERCENT=5      profile a random 5% of requests
+#   PROFILE_ALLOW_HEADER=true     profile requests sent with "X-Profile: true"
+#   PROFILE_SINK=/tmp/profiles    local directory, or s3://bucket/prefix
+#   PROFILE_TOP_N=15              hotspots and allocation sites kept per report
+# Work submitted to a ProfilingThreadPoolExecutor by a profiled request is profiled as well.
+
+PROFILE_HEADER = "x-profile"
+
+# (profiler, future) for every pool task submitted while the current request is profiled
+pool_tasks = contextvars.ContextVar("pool_tasks", default=None)
+# From 3.12 cProfile is built on sys.monitoring: one profiler at a time per process, and it
+# already sees every thread. Per-task profilers are only needed (and only possible) before that.
+PER_TASK_PROFILERS = sys.version_info < (3, 12)
+
+def profiling_config(environ=os.environ):
+    always = environ.get("PROFILE_REQUESTS", "").lower() == "true"
+    sample_percent = float(environ.get("PROFILE_SAMPLE_PERCENT", "0") or 0)
+    allow_header = environ.get("PROFILE_ALLOW_HEADER", "").lower() == "true"
+    if not (always or sample_percent > 0 or allow_header):
+        return None
+    return {
+        "always": always,
+        "sample_percent": sample_percent,
+        "allow_header": allow_header,
+        "sink": environ.get("PROFILE_SINK", "/tmp/profiles"),
+        "top_n": int(environ.get("PROFILE_TOP_N", "15")),
+    }
+
+def should_profile(config, event):
+    if config["always"]:
+        return True
+    if config["allow_header"]:
+        headers = event.get("headers") or {}
+        if any(name.lower() == PROFILE_HEADER and str(value).lower() in ("1", "true")
+               for name, value in headers.items()):
+            return True
+    return config["sample_percent"] > 0 and random.random() * 100 < config["sample_percent"]
+
+# ---------- REPORT ----------
+
+def hotspots(stats, top_n):
+    rows = []
+    for (filename, line, function), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": function,
+            "file": os.path.basename(filename),
+            "line": line,
+            "calls": calls,
+            "self_ms": round(self_time * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["self_ms"], reverse=True)
+    return rows[:top_n]
+
+def allocation_sites(snapshot, top_n):
+    sites = []
+    for stat in snapshot.statistics("lineno")[:top_n]:
+        frame = stat.traceback[0]
+        sites.append({
+            "site": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        })
+    return sites
+
+def write_report(report, sink, put_object=None):
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{report['request_id']}.json"
+    body = json.dumps(report, separators=(",", ":"))
+    if sink.startswith("s3://"):
+        bucket, _, prefix = sink[len("s3://"):].partition("/")
+        key = f"{prefix.rstrip('/')}/{name}" if prefix else name
+        put_object(Bucket=bucket, Key=key, Body=body.encode("utf-8"))
+        return f"s3://{bucket}/{key}"
+    os.makedirs(sink, exist_ok=True)
+    path = os.path.join(sink, name)
+    with open(path, "w") as f:
+        f.write(body)
+    return path
+
+def merged_stats(profiler, tasks):
+    # The handler thread plus every pool task that finished; a task still running
+    # (e.g. a Bedrock call abandoned at the deadline) cannot be read safely and is only counted
+    stats = pstats.Stats(profiler)
+    finished = [task_profiler for task_profiler, future in tasks if future.done()]
+    profiled = [task_profiler for task_profiler in finished if task_profiler is not None]
+    if profiled:
+        stats.add(*profiled)
+    return stats, len(finished), len(tasks) - len(finished)
+
+# ---------- WRAPPER ----------
+
+class ProfilingThreadPoolExecutor(ThreadPoolExecutor):
+    # Before 3.12 cProfile only sees the thread it runs on, so tasks submitted by a profiled request
+    # get their own profiler, merged into the request's report. Unprofiled requests pay one ContextVar read.
+    def submit(self, fn, *args, **kwargs):
+        tasks = pool_tasks.get()
+        if tasks is None:
+            return super().submit(fn, *args, **kwargs)
+        if not PER_TASK_PROFILERS:
+            future = super().submit(fn, *args, **kwargs)
+            tasks.append((None, future))
+            return future
+        profiler = cProfile.Profile()
+        future = super().submit(profiler.runcall, fn, *args, **kwargs)
+        tasks.append((profiler, future))
+        return future
+
+def profile_call(handler, event, context, config, put_object=None):
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Another profiler already owns sys.monitoring (3.12+): answer unprofiled
+        print("Profiling skipped:", str(e))
+        return handler(event, context)
+    tasks = []
+    token = pool_tasks.set(tasks)
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        return handler(event, context)
+    finally:
+        profiler.disable()
+        duration_ms = (time.perf_counter() - start) * 1000
+        pool_tasks.reset(token)
+        # A broken report or sink must never turn a good answer into an error
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            stats, finished, unfinished = merged_stats(profiler, tasks)
+            params = event.get("queryStringParameters") or {}
+            report = {
+                "request_id": getattr(context, "aws_request_id", None) or uuid.uuid4().hex[:12],
+                "question": params.get("q"),
+                "department": params.get("department"),
+                "duration_ms": round(duration_ms, 2),
+                "peak_kb": round(peak / 1024, 1),
+                # Pool tasks (shard retrieval, Bedrock calls) ran on worker threads; their stats are merged into hotspots
+                "pool_tasks": finished,
+                "pool_tasks_unfinished": unfinished,
+                "hotspots": hotspots(stats, config["top_n"]),
+                "allocations": allocation_sites(snapshot, config["top_n"]),
+            }
+            print("Profile written:", write_report(report, config["sink"], put_object))
+        except Exception as e:
+            print("Profile report failed:", str(e))
+        finally:
+            tracemalloc.stop()
+
+def wrap_handler(handler, put_object=None, environ=os.environ):
+    config = profiling_config(environ)
+    if config is None:
+        return handler
+
+    def profiled_handler(event, context):
+        if should_profile(config, event):
+            return profile_call(handler, event, context, config, put_object)
+        return handler(event, context)
+
+    profiled_handler.__wrapped__ = handler
+    return profiled_handler
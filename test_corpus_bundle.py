@@ -0,0 +1,111 @@
+import io
+
+import pytest
+
+import corpus_bundle
+from corpus_bundle import BundleError, build_bundle, decode_section, parse_toc, read_header
+from local_aws import LocalBedrock, LocalS3, Throttled, install_stand_ins, make_department_corpus
+
+FILES = {name: text.encode("utf-8") for name, text in make_department_corpus().items()}
+FILES["tiny.json"] = b"{}"
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_build_and_parse_round_trip(compress):
+    bundle = build_bundle(FILES, compress=compress)
+    sections, data_start = parse_toc(bundle)
+    assert list(sections) == list(FILES)
+    for name, section in sections.items():
+        payload = bundle[data_start + section["offset"]:data_start + section["offset"] + section["length"]]
+        assert decode_section(section, payload) == FILES[name]
+    assert sections["tiny.json"]["compression"] == "none"
+
+def test_read_header_leaves_stream_at_first_section():
+    bundle = build_bundle(FILES)
+    stream = io.BytesIO(bundle)
+    sections, data_start = read_header(stream)
+    assert stream.tell() == data_start
+    assert sections == parse_toc(bundle)[0]
+
+def test_checksum_mismatch_is_detected():
+    bundle = bytearray(build_bundle(FILES, compress=False))
+    sections, data_start = parse_toc(bytes(bundle))
+    section = sections["faqs.json"]
+    bundle[data_start + section["offset"] + 10] ^= 0x01
+    payload = bytes(bundle[data_start + section["offset"]:data_start + section["offset"] + section["length"]])
+    with pytest.raises(BundleError):
+        decode_section(section, payload)
+
+@pytest.mark.parametrize("data", [b"", b"NOPE\x01\x00\x00\x00\x02{}", corpus_bundle.PREAMBLE.pack(b"CBND", 1, 5) + b"[1,2]"])
+def test_invalid_bundles_raise_bundle_error(data):
+    with pytest.raises(BundleError):
+        parse_toc(data)
+
+def test_stream_corpus_reads_bundle_in_one_get(bot):
+    files = make_department_corpus()
+    keys = [f"cse/{name}" for name in files]
+    s3 = LocalS3({"cse": files}, bundle=True)
+    install_stand_ins(bot, s3, LocalBedrock())
+    texts = ["".join(source) for source in bot.stream_corpus("college-ai-data", keys)]
+    assert sorted(texts) == sorted(files.values())
+    # The bundle GET plus the listing that checks it is not older than the plain files
+    assert s3.calls == 2
+
+def test_stream_corpus_reads_plain_files_missing_from_bundle(bot):
+    files = make_department_corpus()
+    s3 = LocalS3({"cse": files}, bundle=True)
+    s3.objects["cse/extra.json"] = b'{"extra": true}'
+    install_stand_ins(bot, s3, LocalBedrock())
+    keys = ["cse/extra.json", "cse/faqs.json", "cse/faculty.json"]
+    texts = ["".join(source) for source in bot.stream_corpus("college-ai-data", keys)]
+    assert sorted(texts) == sorted([files["faqs.json"], files["faculty.json"], '{"extra": true}'])
+    assert s3.calls == 3
+
+def test_missing_bundle_is_cached(bot):
+    s3 = LocalS3({"cse": make_department_corpus()})
+    install_stand_ins(bot, s3, LocalBedrock())
+    assert bot.get_bundle_toc("college-ai-data", "cse/")["sections"] is None
+    assert bot.get_bundle_toc("college-ai-data", "cse/")["sections"] is None
+    assert s3.calls == 1
+
+def test_transient_bundle_error_is_not_cached(bot):
+    s3 = LocalS3({"cse": make_department_corpus()}, bundle=True)
+    install_stand_ins(bot, s3, LocalBedrock())
+    get_object = s3.get_object
+
+    def throttled_once(**kwargs):
+        s3.get_object = get_object
+        raise Throttled("SlowDown", "Please reduce your request rate.")
+
+    s3.get_object = throttled_once
+    assert bot.get_bundle_toc("college-ai-data", "cse/")["sections"] is None
+    assert bot.get_bundle_toc("college-ai-data", "cse/")["sections"] is not None
+
+def test_section_read_refetches_toc_after_bundle_shrinks(bot):
+    files = make_department_corpus()
+    s3 = LocalS3({"cse": files}, bundle=True)
+    install_stand_ins(bot, s3, LocalBedrock())
+    key = "cse/important_questions_links.json"
+    assert bot.read_file_from_s3("college-ai-data", key) == files["important_questions_links.json"]
+
+    # Rebuilt with less data: the cached TOC now points past the end of the object
+    s3.objects["cse/" + corpus_bundle.BUNDLE_NAME] = build_bundle({name: b"{}" for name in files})
+    assert bot.read_file_from_s3("college-ai-data", key) == "{}"
+
+def test_plain_file_newer_than_bundle_is_read_instead(bot):
+    files = make_department_corpus()
+    s3 = LocalS3({"cse": files}, bundle=True)
+    install_stand_ins(bot, s3, LocalBedrock())
+    s3.put_object(Bucket="college-ai-data", Key="cse/faqs.json", Body=b'[{"question": "q", "answer": "edited"}]')
+
+    assert bot.read_file_from_s3("college-ai-data", "cse/faqs.json") == '[{"question": "q", "answer": "edited"}]'
+    texts = ["".join(source) for source in bot.stream_corpus("college-ai-data", ["cse/faqs.json", "cse/faculty.json"])]
+    assert '[{"question": "q", "answer": "edited"}]' in texts
+
+def test_stale_bundle_is_detected_when_opened_for_streaming(bot):
+    files = make_department_corpus()
+    s3 = LocalS3({"cse": files}, bundle=True)
+    install_stand_ins(bot, s3, LocalBedrock())
+    s3.put_object(Bucket="college-ai-data", Key="cse/faculty.json", Body=b'{"faculty": []}')
+    texts = ["".join(source) for source in bot.stream_corpus("college-ai-data", ["cse/faqs.json", "cse/faculty.json"])]
+    assert '{"faculty": []}' in texts
+    assert bot.bundle_tocs["cse/" + corpus_bundle.BUNDLE_NAME]["sections"] is None
@@ -0,0 +1,65 @@
+import json
+import time
+
+from local_aws import LocalBedrock, LocalS3, install_stand_ins, make_department_corpus
+
+QUESTION = "how do I apply for a bonafide certificate"
+
+def ask(bot, question=QUESTION):
+    start = time.perf_counter()
+    response = bot.lambda_handler({"queryStringParameters": {"q": question, "department": "cse"}}, None)
+    return json.loads(response["body"]), time.perf_counter() - start
+
+def use_bedrock(bot, monkeypatch, bedrock, budget=1.5):
+    monkeypatch.setattr(bot, "REQUEST_BUDGET_SECONDS", budget)
+    monkeypatch.setattr(bot, "FALLBACK_RESERVE_SECONDS", 0.3)
+    monkeypatch.setattr(bot, "BEDROCK_MIN_SECONDS", 0.2)
+    install_stand_ins(bot, LocalS3({"cse": make_department_corpus()}), bedrock)
+    return bedrock
+
+def test_healthy_bedrock_answers(bot, monkeypatch):
+    bedrock = use_bedrock(bot, monkeypatch, LocalBedrock())
+    body, _ = ask(bot)
+    assert not body.get("extractive")
+    assert bedrock.calls == 1
+
+def test_hanging_bedrock_falls_back_within_budget(bot, monkeypatch):
+    use_bedrock(bot, monkeypatch, LocalBedrock(mode="hang", hang_seconds=3))
+    body, elapsed = ask(bot)
+    assert body["extractive"] is True
+    assert body["answer"].strip()
+    assert elapsed < 1.5
+
+def test_failing_bedrock_opens_breaker(bot, monkeypatch):
+    bedrock = use_bedrock(bot, monkeypatch, LocalBedrock(mode="fail"))
+    for _ in range(bot.BREAKER_FAILURE_THRESHOLD):
+        body, _ = ask(bot)
+        assert body["extractive"] is True
+    assert bot.breaker_state["opened_at"] is not None
+
+    body, _ = ask(bot)
+    assert body["extractive"] is True
+    assert bedrock.calls == bot.BREAKER_FAILURE_THRESHOLD
+
+def test_skipped_bedrock_does_not_count_against_breaker(bot, monkeypatch):
+    bedrock = use_bedrock(bot, monkeypatch, LocalBedrock())
+    # Every request runs out of time before Bedrock could be called
+    monkeypatch.setattr(bot, "BEDROCK_MIN_SECONDS", 60)
+    for _ in range(bot.BREAKER_FAILURE_THRESHOLD + 1):
+        body, _ = ask(bot)
+        assert body["extractive"] is True
+    assert bedrock.calls == 0
+    assert bot.breaker_state == {"failures": 0, "opened_at": None}
+
+    monkeypatch.setattr(bot, "BEDROCK_MIN_SECONDS", 0.2)
+    body, _ = ask(bot)
+    assert not body.get("extractive")
+
+def test_timed_out_call_queued_behind_hung_workers_is_cancelled(bot, monkeypatch):
+    bedrock = use_bedrock(bot, monkeypatch, LocalBedrock(mode="hang", hang_seconds=2), budget=1.0)
+    monkeypatch.setattr(bot, "bedrock_pool", type(bot.bedrock_pool)(max_workers=1))
+    ask(bot)
+    ask(bot)
+    time.sleep(2.5)
+    # The second call waited for the only worker and was cancelled instead of running late
+    assert bedrock.calls == 1
@@ -0,0 +1,57 @@
+import json
+import threading
+import time
+
+from local_aws import LocalBedrock, LocalS3, install_stand_ins, make_department_corpus
+
+DEPARTMENTS = ["cse", "it", "csbs", "aids"]
+
+def fanout_stand_ins(bot, monkeypatch, slow_department=None):
+    s3 = LocalS3({department: make_department_corpus(seed=i) for i, department in enumerate(DEPARTMENTS)})
+    bedrock = LocalBedrock()
+    install_stand_ins(bot, s3, bedrock)
+    monkeypatch.setattr(bot, "REQUEST_BUDGET_SECONDS", 2.0)
+    monkeypatch.setattr(bot, "FALLBACK_RESERVE_SECONDS", 0.2)
+    monkeypatch.setattr(bot, "BEDROCK_MIN_SECONDS", 0.2)
+    released = threading.Event()
+    if slow_department:
+        get_object = s3.get_object
+
+        def slow_get_object(**kwargs):
+            if kwargs["Key"].startswith(slow_department + "/"):
+                released.wait(10)
+            return get_object(**kwargs)
+
+        s3.get_object = slow_get_object
+    return bedrock, released
+
+def ask_all(bot, question="which faculty work on iot and edge computing"):
+    start = time.perf_counter()
+    response = bot.lambda_handler({"queryStringParameters": {"q": question, "department": "all"}}, None)
+    return json.loads(response["body"]), time.perf_counter() - start
+
+def test_fanout_merges_departments(bot, monkeypatch):
+    fanout_stand_ins(bot, monkeypatch)
+    context = bot.find_best_chunks_across_departments(
+        "college-ai-data", DEPARTMENTS, list(make_department_corpus()), "machine learning faculty")
+    labels = {line for line in context.splitlines() if line.startswith(bot.PROVENANCE_PREFIX)}
+    assert labels and labels <= {bot.PROVENANCE_PREFIX + department.upper() for department in DEPARTMENTS}
+
+def test_slow_shard_leaves_time_for_claude(bot, monkeypatch):
+    bedrock, released = fanout_stand_ins(bot, monkeypatch, slow_department="aids")
+    try:
+        body, elapsed = ask_all(bot)
+    finally:
+        released.set()
+    assert not body.get("extractive")
+    assert bedrock.calls == 1
+    assert elapsed < 2.0
+    assert bot.breaker_state["failures"] == 0
+
+def test_unknown_departments_are_rejected(bot, monkeypatch):
+    bedrock, _ = fanout_stand_ins(bot, monkeypatch)
+    department = ",".join(["cse"] + [f"x{i}" for i in range(50)])
+    response = bot.lambda_handler({"queryStringParameters": {"q": "list faculty", "department": department}}, None)
+    assert response["statusCode"] == 400
+    assert "x0" in json.loads(response["body"])["error"]
+    assert bot.s3.calls == 0 and bedrock.calls == 0
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+def ask(bot, question, department="cse"):
+    calls = bot.bedrock.calls
+    response = bot.lambda_handler({"queryStringParameters": {"q": question, "department": department}}, None)
+    return json.loads(response["body"])["answer"], bot.bedrock.calls > calls
+
+@pytest.mark.parametrize("question", [
+    "What is the vision of the department?",
+    "what is the missoin",
+    "vision of cse",
+])
+def test_confident_matches_skip_bedrock(bot, question):
+    answer, asked_claude = ask(bot, question)
+    assert not asked_claude
+    assert answer.startswith("To ")
+
+@pytest.mark.parametrize("question", [
+    "vision of the IT department",
+    "what is the mission of aids",
+    "mission of the it department",
+    "vision of dept of it",
+])
+def test_other_department_goes_to_claude(bot, question):
+    _, asked_claude = ask(bot, question)
+    assert asked_claude
+
+@pytest.mark.parametrize("question, named", [
+    ("what is the vision and how is it achieved", []),
+    ("is it true the department has a mission", []),
+    ("vision of the IT department", ["it"]),
+    ("what is the mission of aids", ["aids"]),
+])
+def test_pronoun_it_is_not_a_department(bot, question, named):
+    assert bot.other_departments_named(question, "cse") == named
+
+def test_faq_pairs_accepts_a_plain_mapping(bot):
+    pairs = bot.faq_pairs({"vision": "Excellence", "mission": ["Teach", "Research"]})
+    assert pairs == [("vision", "Excellence"), ("mission", "• Teach\n• Research")]
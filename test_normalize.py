@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from local_aws import LocalBedrock, LocalS3, install_stand_ins, make_department_corpus
+
+def normalize(bot, question):
+    return bot.normalize_query(question, bot.get_query_index("college-ai-data", "cse/", question))
+
+@pytest.fixture
+def vocabulary_bot(bot):
+    s3 = LocalS3({"cse": make_department_corpus()}, bundle=True)
+    install_stand_ins(bot, s3, LocalBedrock())
+    return bot
+
+@pytest.mark.parametrize("question", [
+    "admission procedure",
+    "hostel fees",
+    "placement cell",
+    "tell me about dr. ramesh kumar",
+    "what is the vision of the department",
+    "which faculty research machine learning",
+    "what facility does the library have",
+    "how much stuff is in the lab",
+    "placement stats",
+])
+def test_real_words_and_names_are_left_alone(vocabulary_bot, question):
+    assert normalize(vocabulary_bot, question) == question
+
+@pytest.mark.parametrize("question, expected", [
+    ("facutly list", "faculty list"),
+    ("what is the missoin", "what is the mission"),
+    ("proffesor of machine lerning", "professor of machine learning"),
+    ("intership details", "internship details"),
+    ("syllabys for sem3", "syllabus for semester 3"),
+    ("3rd sem imp ques", "semester 3 important questions"),
+    ("cse-3001 details", "cs3001 details"),
+])
+def test_typos_abbreviations_and_codes_are_normalized(vocabulary_bot, question, expected):
+    assert normalize(vocabulary_bot, question) == expected
+
+def test_routing_only_questions_do_not_read_s3(bot):
+    s3 = LocalS3({"cse": make_department_corpus()}, bundle=True)
+    install_stand_ins(bot, s3, LocalBedrock())
+    for question in ("list faculty", "important question links sem 3", "elective courses", "what is the vision"):
+        normalize(bot, question)
+    assert s3.calls == 0
+
+def test_vocabulary_is_read_once_per_department(vocabulary_bot):
+    normalize(vocabulary_bot, "which profesor teaches compter vision")
+    normalize(vocabulary_bot, "proffesor of machine lerning")
+    assert vocabulary_bot.s3.calls == 1
+
+def test_claude_gets_the_original_question(bot, monkeypatch):
+    asked = []
+    monkeypatch.setattr(bot, "answer_with_claude", lambda context, question, deadline=None: asked.append(question))
+    bot.lambda_handler({"queryStringParameters": {"q": "How do I apply for a bonafide certficate?"}}, None)
+    assert asked == ["How do I apply for a bonafide certficate?"]
+
+def test_subject_link_found_by_course_code(bot):
+    files = make_department_corpus()
+    files["important_questions_links.json"] = json.dumps({"Semester 4": {"CS3001 Algorithms": "https://youtube.com/a"}})
+    install_stand_ins(bot, LocalS3({"cse": files}, bundle=True), LocalBedrock())
+    event = {"queryStringParameters": {"q": "important questions link for cse-3001 algorithms", "department": "cse"}}
+    answer = json.loads(bot.lambda_handler(event, None)["body"])["answer"]
+    assert "https://youtube.com/a" in answer
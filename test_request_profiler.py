@@ -0,0 +1,43 @@
+import cProfile
+import json
+
+from request_profiler import ProfilingThreadPoolExecutor, wrap_handler
+
+pool = ProfilingThreadPoolExecutor(max_workers=2)
+
+def score_on_worker(n):
+    return sum(i * i for i in range(n))
+
+def handler(event, context):
+    futures = [pool.submit(score_on_worker, 20000) for _ in range(3)]
+    return {"statusCode": 200, "body": json.dumps({"answer": sum(f.result() for f in futures)})}
+
+def test_disabled_profiling_returns_handler_unchanged():
+    assert wrap_handler(handler, environ={}) is handler
+
+def test_report_covers_pool_tasks(tmp_path):
+    profiled = wrap_handler(handler, environ={"PROFILE_REQUESTS": "true", "PROFILE_SINK": str(tmp_path),
+                                              "PROFILE_TOP_N": "50"})
+    assert profiled({"queryStringParameters": {"q": "hi"}}, None)["statusCode"] == 200
+
+    [path] = tmp_path.iterdir()
+    report = json.loads(path.read_text())
+    assert report["pool_tasks"] == 3
+    assert report["pool_tasks_unfinished"] == 0
+    assert "score_on_worker" in {row["function"] for row in report["hotspots"]}
+
+def test_report_failure_keeps_the_answer(tmp_path, monkeypatch):
+    monkeypatch.setattr("request_profiler.merged_stats", lambda profiler, tasks: 1 / 0)
+    profiled = wrap_handler(handler, environ={"PROFILE_REQUESTS": "true", "PROFILE_SINK": str(tmp_path)})
+    assert profiled({"queryStringParameters": {"q": "hi"}}, None)["statusCode"] == 200
+    assert not list(tmp_path.iterdir())
+
+def test_handler_answers_while_another_profiler_is_active(tmp_path):
+    profiled = wrap_handler(handler, environ={"PROFILE_REQUESTS": "true", "PROFILE_SINK": str(tmp_path)})
+    outer = cProfile.Profile()
+    outer.enable()
+    try:
+        response = profiled({"queryStringParameters": {"q": "hi"}}, None)
+    finally:
+        outer.disable()
+    assert response["statusCode"] == 200
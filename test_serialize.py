@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from local_aws import make_department_corpus
+
+FACULTY = {
+    "Name": "Dr. Anitha R",
+    "Title": "Professor",
+    "Phone": "",
+    "Email": None,
+    "Photo": "https://college.edu/images/anitha.jpg",
+    "id": 42,
+    "Achievements": json.dumps(["Best paper award (2019)", "Grant from \"DST\" (2021)"]),
+}
+
+def leaves(value, field=None):
+    # Every fact a prompt should keep: non-empty scalar values outside IRRELEVANT_FIELDS
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from leaves(item, key)
+    elif isinstance(value, list):
+        for item in value:
+            yield from leaves(item, field)
+    elif isinstance(value, str) and value[:1] == "[":
+        yield from leaves(json.loads(value), field)
+    elif value not in ("", None):
+        yield field, str(value)
+
+def test_records_become_field_lines(bot):
+    compact = bot.compact_json_text(json.dumps({"faculty": [FACULTY]}, indent=2))
+    assert compact.splitlines() == [
+        "faculty:",
+        "Name: Dr. Anitha R",
+        "Title: Professor",
+        'Achievements: Best paper award (2019); Grant from "DST" (2021)',
+    ]
+
+def test_empty_null_and_irrelevant_fields_are_dropped(bot):
+    compact = bot.compact_json_text(json.dumps(FACULTY))
+    for dropped in ("Phone", "Email", "null", "Photo", "anitha.jpg", "id:", "42"):
+        assert dropped not in compact
+
+@pytest.mark.parametrize("name", list(make_department_corpus()))
+def test_every_fact_is_kept(bot, name):
+    text = make_department_corpus()[name]
+    compact = bot.compact_json_text(text)
+    for field, value in leaves(json.loads(text)):
+        if field is None or field.lower() not in bot.IRRELEVANT_FIELDS:
+            assert value in compact
+    assert bot.estimate_tokens(compact) < bot.estimate_tokens(text)
+
+@pytest.mark.parametrize("start", [1, 5, 9, 14, 23, 40])
+def test_chunk_cut_inside_a_string_or_key(bot, start):
+    text = json.dumps([{"course_name": "Distributed Systems", "credits": 4}, {"course_name": "Databases"}], indent=2)
+    compact = bot.compact_json_text(text[start:])
+    assert '"' not in compact and "{" not in compact
+    assert "course name: Databases" in compact
+
+def test_chunk_cut_inside_nested_achievements(bot):
+    text = json.dumps({"Name": "Dr. Anitha R", "Achievements": FACULTY["Achievements"]})
+    compact = bot.compact_json_text(text[:text.index("(2021)")])
+    assert "Name: Dr. Anitha R" in compact
+    assert "Best paper award (2019)" in compact
+
+def test_plain_text_starting_with_a_bracket_is_not_parsed(bot):
+    compact = bot.compact_json_text(json.dumps([{"title": "[Draft] Edge computing survey", "year": 2020}]))
+    assert "title: [Draft] Edge computing survey" in compact.splitlines()
+
+def test_serialize_context_keeps_department_labels(bot):
+    context = "Department: IT\n" + json.dumps({"vision": "Excellence"}) + "\n\n" + json.dumps({"mission": "Teach"})
+    assert bot.serialize_context(context) == "Department: IT\nvision: Excellence\n\nmission: Teach"
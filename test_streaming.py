@@ -0,0 +1,36 @@
+import tracemalloc
+
+import pytest
+
+from local_aws import LocalBedrock, LocalS3, install_stand_ins, make_department_corpus
+
+QUESTION = "Which faculty research machine learning?"
+
+def peak_retrieval_memory(bot, scale, bundle):
+    files = make_department_corpus(scale)
+    install_stand_ins(bot, LocalS3({"cse": files}, bundle=bundle), LocalBedrock())
+    bot.bundle_tocs.clear()
+    keys = [f"cse/{name}" for name in files]
+    tracemalloc.start()
+    context = bot.find_best_chunks_in_stream(bot.stream_corpus("college-ai-data", keys), QUESTION)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert context
+    return peak, sum(len(text) for text in files.values())
+
+@pytest.mark.parametrize("bundle", [False, True])
+def test_stream_peak_memory_is_flat(bot, bundle):
+    peak_small, _ = peak_retrieval_memory(bot, 8, bundle)
+    peak_large, corpus_size = peak_retrieval_memory(bot, 32, bundle)
+    assert peak_large < 1.25 * peak_small
+    assert peak_large < corpus_size / 4
+
+def test_iter_chunks_matches_chunk_text(bot):
+    text = "".join(chr(ord("a") + i % 26) for i in range(5321))
+    blocks = [text[i:i + 777] for i in range(0, len(text), 777)]
+    assert list(bot.iter_chunks(blocks)) == bot.chunk_text(text)
+
+def test_top_chunks_matches_find_best_chunks(bot):
+    text = "\n\n".join(make_department_corpus().values())
+    blocks = [text[i:i + 4096] for i in range(0, len(text), 4096)]
+    assert bot.find_best_chunks_in_stream([blocks], QUESTION) == bot.find_best_chunks(text, QUESTION)